@@ -5,6 +5,9 @@ from .lib import fusion360utils as futil
 
 def run(context):
     try:
+        # Log messages are written in the background while the add-in is running
+        futil.start_logging()
+
         # This will run the start function in each of your commands as defined in commands/__init__.py
         commands.start()
 
@@ -20,5 +23,8 @@ def stop(context):
         # This will run the start function in each of your commands as defined in commands/__init__.py
         commands.stop()
 
+        # Write the remaining log messages
+        futil.stop_logging()
+
     except:
         futil.handle_error('stop')
@@ -17,42 +17,39 @@ ui = app.userInterface
 def run(context):
     try:
 
-        # Create a csv file for results
-        with open(csv_file_name, mode='w') as csv_file:
+        # We don't want to mess up the documents collection by closing them while we are still iterating
+        documents_to_close = []
+
+        # Create a csv file for results, it stays open while the documents are processed
+        with open(csv_file_name, mode='w', newline='') as csv_file:
             fieldnames = ['Name', 'URN', 'Link']
             writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
             writer.writeheader()
 
-        # We don't want to mess up the documents collection by closing them while we are still iterating
-        documents_to_close = []
-
-        # Iterate over all open documents
-        document: adsk.core.Document
-        for document in app.documents:
-            document.activate()
+            # Iterate over all open documents
+            document: adsk.core.Document
+            for document in app.documents:
+                document.activate()
 
-            # Check if this document is saved and assume it is one we imported.
-            if document.isSaved:
+                # Check if this document is saved and assume it is one we imported.
+                if document.isSaved:
 
-                # Get the data file (Cloud representation) and check that it is done processing and available
-                data_file = document.dataFile
-                if data_file.isComplete:
+                    # Get the data file (Cloud representation) and check that it is done processing and available
+                    data_file = document.dataFile
+                    if data_file.isComplete:
 
-                    # Create the public link for the data file
-                    public_link = data_file.publicLink
+                        # Create the public link for the data file
+                        public_link = data_file.publicLink
 
-                    # Write results to the output csv file
-                    with open(csv_file_name, mode='a') as csv_file:
-                        fieldnames = ['Name', 'URN', 'Link']
-                        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+                        # Write results to the output csv file
                         writer.writerow({
                             'Name': data_file.name,
                             'URN': data_file.versionId,
                             'Link': public_link
                         })
 
-                    # Add this to list of documents to close
-                    documents_to_close.append(document)
+                        # Add this to list of documents to close
+                        documents_to_close.append(document)
 
         # Close the documents
         for document in documents_to_close:
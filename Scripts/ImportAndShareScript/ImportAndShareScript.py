@@ -19,6 +19,10 @@ imported_documents = {}
 # Flag to determine when it is safe to terminate the script
 DONE_IMPORTING = False
 
+# Results csv file and writer, kept open until the script terminates
+csv_file = None
+csv_writer = None
+
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
@@ -31,6 +35,8 @@ ui = app.userInterface
 def run(context):
     global DONE_IMPORTING
     global imported_filenames
+    global csv_file
+    global csv_writer
     try:
 
         # Have User select a folder containing STEP Files to be imported
@@ -53,10 +59,11 @@ def run(context):
             return
 
         # Create a csv file for results
-        with open(csv_file_name, mode='w') as csv_file:
-            fieldnames = ['Name', 'URN', 'Link']
-            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            writer.writeheader()
+        csv_file = open(csv_file_name, mode='w', newline='')
+        fieldnames = ['Name', 'URN', 'Link']
+        csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        csv_writer.writeheader()
+        csv_file.flush()
 
         # Setup Event handler to process files after initial save is complete
         onDataFileComplete = MyDataFileCompleteHandler()
@@ -112,14 +119,12 @@ class MyDataFileCompleteHandler(adsk.core.DataEventHandler):
                 public_link = data_file.publicLink
 
                 # Write results to the output csv file
-                with open(csv_file_name, mode='a') as csv_file:
-                    fieldnames = ['Name', 'URN', 'Link']
-                    writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-                    writer.writerow({
-                        'Name': data_file.name,
-                        'URN': data_file.versionId,
-                        'Link': public_link
-                    })
+                csv_writer.writerow({
+                    'Name': data_file.name,
+                    'URN': data_file.versionId,
+                    'Link': public_link
+                })
+                csv_file.flush()
 
                 # remove this from the list and close
                 imported_filenames.remove(args.file.name)
@@ -128,6 +133,7 @@ class MyDataFileCompleteHandler(adsk.core.DataEventHandler):
 
             # Terminate the script after the last file is processed
             if len(imported_filenames) == 0 and DONE_IMPORTING:
+                csv_file.close()
                 adsk.terminate()
                 app.log(f'Script Complete')
 
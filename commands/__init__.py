@@ -1,26 +1,38 @@
 # Here you define the commands that will be added to your add-in.
+import time
 
-# If you want to add an additional command, duplicate one of the existing directories and import it here.
-# You need to use aliases (import "entry" as "my_module") assuming you have the default module named "entry".
-from .importFolder import entry as import_folder
+from ..lib import fusion360utils as futil
+from .lazy_command import LazyCommand
+
+# If you want to add an additional command, duplicate one of the existing directories and add it here.
+# Button commands are created with LazyCommand from the description in their package's __init__.py,
+# their entry module is only imported when the button is clicked the first time.
+# Modules that have to handle events from the start are imported directly, using aliases
+# (import "entry" as "my_module") assuming you have the default module named "entry".
+_started = time.perf_counter()
 from .dataFileComplete import entry as complete
-from .closeAll import entry as close
-from .processRemaining import entry as remaining
+import_time = time.perf_counter() - _started
 
 # Fusion will automatically call the start() and stop() functions.
 commands = [
-    import_folder,
+    LazyCommand('importFolder'),
+    LazyCommand('watchFolder'),
     complete,
-    close,
-    remaining,
+    LazyCommand('closeAll'),
+    LazyCommand('processRemaining'),
 ]
 
 
 # Assumes you defined a "start" function in each of your modules.
 # The start function will be run when the add-in is started.
+# The time taken by each command is written to the log, so a slow start up can be tracked down.
 def start():
+    timings = [f'{"imports":<20} {import_time * 1000:>8.1f} ms']
     for command in commands:
+        started = time.perf_counter()
         command.start()
+        timings.append(f'{_command_name(command):<20} {(time.perf_counter() - started) * 1000:>8.1f} ms')
+    futil.log('Start up times\n' + '\n'.join(timings))
 
 
 # Assumes you defined a "stop" function in each of your modules.
@@ -28,3 +40,7 @@ def start():
 def stop():
     for command in commands:
         command.stop()
+
+
+def _command_name(command) -> str:
+    return getattr(command, 'CMD_NAME', None) or command.__name__.split('.')[-2]
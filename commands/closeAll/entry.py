@@ -1,76 +1,17 @@
 import adsk.core
-import os
+from ..dataFileComplete.entry import close_finished_documents
 from ...lib import fusion360utils as futil
-from ... import config
 app = adsk.core.Application.get()
 ui = app.userInterface
 
-# Set Command name and description
-CMD_NAME = 'Close All'
-CMD_Description = 'Closes all active documents'
-
-# Command ID must be unique relative to other commands in Fusion 360
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = True
-
-# This is done by specifying the workspace, the tab, and the panel, and the
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment'
-PANEL_ID = 'SolidScriptsAddinsPanel'
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+# Name of the command, the button is created from the description in __init__.py
+from . import CMD_NAME
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
 
-# Executed when add-in is run.
-# Typically don't need to change anything here.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-
-    # Get the panel the button will be created in.
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-# Typically don't need to change anything here.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
-
-
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
@@ -92,11 +33,9 @@ def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     futil.log(f'{CMD_NAME} Command Execute Event')
 
-    all_docs = [document for document in app.documents]
-
-    doc: adsk.core.Document
-    for doc in all_docs:
-        doc.close(False)
+    # Only documents imported by this add-in that are complete, the user's own documents stay open
+    closed = close_finished_documents()
+    futil.log(f'{CMD_NAME}: closed {closed} documents', force_console=True)
 
 
 # This event handler is called when the command terminates.
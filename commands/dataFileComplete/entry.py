@@ -1,53 +1,111 @@
-import csv
-import json
+import collections
+import os
 import time
 
 import adsk.core
 
 from ... import config
 from ...lib import fusion360utils as futil
+from ...lib import importutils
 
 app = adsk.core.Application.get()
 ui = app.userInterface
 
 NAME1 = 'Data_Handler'
-NAME2 = "Custom Import Event"
-NAME3 = "Custom Save Event"
-NAME4 = "Custom Close Event"
+NAME2 = "Custom Dispatch Event"
+NAME5 = "Custom Watchdog Event"
+NAME6 = "Custom Watch Event"
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 my_data_handlers = []
 my_custom_handlers = []
 
+# Files waiting to be imported, limits how many documents are open at the same time
+import_scheduler = importutils.ImportScheduler(config.MAX_OPEN_DOCUMENTS)
+
+# Counts the Fusion API calls made while handling a single event
+api_calls = importutils.ApiCallCounter()
+
+# Every result is written to the journal as soon as the share link is created
+results_journal = importutils.ResultsJournal(config.journal_file_name)
+
+# Outputs the results are streamed to
+result_sinks = []
+
+# Results of previous runs, unchanged files are not imported again
+import_manifest = importutils.ImportManifest(config.manifest_file_name)
+
+# Cloud folders matching the sub folders of the imported folder
+target_folders = importutils.DataFolderCache()
+
+# State of every file of the run, kept on disk so memory doesn't grow with the number of files
+job_store = importutils.JobStore(config.state_file_name)
+
+# Import, save and close steps waiting to be run by the dispatch event, as (step, job) pairs
+work_queue = collections.deque()
+dispatch_pending = False
+
+# Number of steps in work_queue for each file, the slot of a file isn't given away while one is waiting
+queued_steps = collections.Counter()
+
+# Pauses imports while Fusion uses too much memory
+memory_governor = importutils.MemoryGovernor()
+
+# Fires the watchdog event that checks for files stuck waiting for their share link
+watchdog_timer = importutils.PeriodicTimer(
+    config.WATCHDOG_INTERVAL, lambda: app.fireCustomEvent(config.custom_event_id_watchdog, ''))
+
+# Fires the watch event that rescans the watched folder for new and changed files
+watch_timer = importutils.PeriodicTimer(
+    config.WATCH_INTERVAL, lambda: app.fireCustomEvent(config.custom_event_id_watch, ''))
+
+# Index of the watched folder, None if no folder is watched
+folder_watcher = None
+last_full_scan = time.monotonic()
+
+# Time each file reaches every stage of the pipeline
+lifecycle_trace = importutils.LifecycleTrace()
+
+# Start of the run, the time until each file had its share link is counted from here
+run_started = time.monotonic()
+
+# While a folder is watched the run is kept open for the files that are still to come
+run_kept_open = False
+
 
 # Executed when add-in is run.  Create custom events so we don't disrupt the main application loop.
 def start():
-    app.unregisterCustomEvent(config.custom_event_id_import)
-    custom_event_import = app.registerCustomEvent(config.custom_event_id_import)
-    custom_event_handler_import = futil.add_handler(custom_event_import, handle_import, name=NAME2)
+    try:
+        job_store.open()
+    except:
+        futil.handle_error(f'Unable to open {config.state_file_name}')
+
+    app.unregisterCustomEvent(config.custom_event_id_dispatch)
+    custom_event_dispatch = app.registerCustomEvent(config.custom_event_id_dispatch)
+    custom_event_handler_dispatch = futil.add_handler(custom_event_dispatch, handle_dispatch, name=NAME2)
     my_custom_handlers.append({
-        'custom_event_id': config.custom_event_id_import,
-        'custom_event': custom_event_import,
-        'custom_event_handler': custom_event_handler_import
+        'custom_event_id': config.custom_event_id_dispatch,
+        'custom_event': custom_event_dispatch,
+        'custom_event_handler': custom_event_handler_dispatch
     })
 
-    app.unregisterCustomEvent(config.custom_event_id_save)
-    custom_event_save = app.registerCustomEvent(config.custom_event_id_save)
-    custom_event_handler_save = futil.add_handler(custom_event_save, handle_save, name=NAME3)
+    app.unregisterCustomEvent(config.custom_event_id_watchdog)
+    custom_event_watchdog = app.registerCustomEvent(config.custom_event_id_watchdog)
+    custom_event_handler_watchdog = futil.add_handler(custom_event_watchdog, handle_watchdog, name=NAME5)
     my_custom_handlers.append({
-        'custom_event_id': config.custom_event_id_save,
-        'custom_event': custom_event_save,
-        'custom_event_handler': custom_event_handler_save
+        'custom_event_id': config.custom_event_id_watchdog,
+        'custom_event': custom_event_watchdog,
+        'custom_event_handler': custom_event_handler_watchdog
     })
 
-    app.unregisterCustomEvent(config.custom_event_id_close)
-    custom_event_close = app.registerCustomEvent(config.custom_event_id_close)
-    custom_event_handler_close = futil.add_handler(custom_event_close, handle_close, name=NAME4)
+    app.unregisterCustomEvent(config.custom_event_id_watch)
+    custom_event_watch = app.registerCustomEvent(config.custom_event_id_watch)
+    custom_event_handler_watch = futil.add_handler(custom_event_watch, handle_watch, name=NAME6)
     my_custom_handlers.append({
-        'custom_event_id': config.custom_event_id_close,
-        'custom_event': custom_event_close,
-        'custom_event_handler': custom_event_handler_close
+        'custom_event_id': config.custom_event_id_watch,
+        'custom_event': custom_event_watch,
+        'custom_event_handler': custom_event_handler_watch
     })
 
     # Create the event handler for when data files are complete.
@@ -63,6 +121,11 @@ def stop():
     futil.log(f'**********local_handlers stop: {len(local_handlers)}')
     futil.log(f'**********my_data_handlers stop: {len(my_data_handlers)}')
 
+    watchdog_timer.stop()
+    watch_timer.stop()
+    work_queue.clear()
+    queued_steps.clear()
+
     for custom_item in my_custom_handlers:
         custom_item['custom_event'].remove(custom_item['custom_event_handler'])
         app.unregisterCustomEvent(custom_item['custom_event_id'])
@@ -70,117 +133,783 @@ def stop():
     for data_handler in my_data_handlers:
         app.dataFileComplete.remove(data_handler)
 
+    # Write the results collected so far, the run can be finished with Process Remaining after a restart
+    close_result_sinks()
+    results_journal.close()
+    job_store.close()
+
+
+# Start a new run with the given files to import, jobs can be a generator that is read as files are needed
+# A run that is kept open isn't finished when it runs out of files, more can be added with add_to_import_run
+def start_import_run(jobs, keep_open: bool = False):
+    global run_started, run_kept_open
+    run_started = time.monotonic()
+    run_kept_open = keep_open
+    futil.clear_profile()
+
+    if config.TRACE_TIMINGS:
+        lifecycle_trace.open(config.trace_file_name)
+
+    import_scheduler.clear()
+    import_scheduler.max_open = max(1, config.MAX_OPEN_DOCUMENTS)
+    import_scheduler.format_limits = dict(config.FORMAT_MAX_OPEN)
+    memory_governor.high_mb = config.MEMORY_HIGH_WATER_MB
+    memory_governor.low_mb = config.MEMORY_LOW_WATER_MB
+    memory_governor.reset()
+    if memory_governor.enabled and config.MEMORY_LOW_WATER_MB >= config.MEMORY_HIGH_WATER_MB:
+        futil.log(f'**********MEMORY_LOW_WATER_MB {config.MEMORY_LOW_WATER_MB} is not below MEMORY_HIGH_WATER_MB '
+                  f'{config.MEMORY_HIGH_WATER_MB}, imports resume below {memory_governor.resume_mb:.0f} MB',
+                  adsk.core.LogLevels.WarningLogLevel, force_console=True)
+    target_folders.reset(config.target_data_folder)
+
+    # Sorting reads the whole folder first, 'fifo' leaves the jobs as they are
+    jobs = importutils.order_jobs(jobs, config.IMPORT_ORDER)
+
+    open_result_sinks()
+
+    if config.RESUME_RUN:
+        # Skip the files linked by the previous run and write their results again, files that were
+        # still in progress are imported again
+        job_store.reset(keep_finished=True)
+        finished = 0
+        for record in importutils.read_journal(config.journal_file_name):
+            if record.get('Link'):
+                finished += 1
+                write_to_sinks(record)
+        futil.log(f'**********Resuming run, {finished} files already finished')
+        jobs = (job for job in jobs if not job_store.has_link(job['key']))
+        results_journal.open()
+    else:
+        job_store.reset()
+        results_journal.open(truncate=True)
+    job_store.start_run()
 
-# Import a document from the list
-def handle_import(args: adsk.core.CustomEventArgs):
-    event_data = json.loads(args.additionalInfo)
-    file_name = event_data['file_name']
-    file_path = event_data['file_path']
+    if config.USE_MANIFEST_CACHE:
+        import_manifest.load()
 
-    futil.log(f'**********Importing: {file_name}')
+    import_scheduler.add_source(filter_jobs(jobs))
+
+    watchdog_timer.interval = config.WATCHDOG_INTERVAL
+    watchdog_timer.start()
+
+    if import_scheduler.is_idle:
+        finish_run_if_idle()
+    else:
+        feed_imports()
 
-    # Execute the Fusion 360 import into a new document
-    import_manager = app.importManager
-    step_options = import_manager.createSTEPImportOptions(file_path)
-    new_document = import_manager.importToNewDocument(step_options)
 
-    # Keep track of imported files
-    config.imported_documents[file_name] = new_document
-    config.imported_filenames.append(file_name)
+# Add files to the run in progress, they go through the same checks as the files the run started with.
+# The files are read as they are needed, after the files added before them.
+def add_to_import_run(jobs):
+    jobs = (job for job in jobs if not has_active_job(job))
+    import_scheduler.add_source(filter_jobs(jobs))
+    if import_scheduler.is_idle:
+        finish_run_if_idle()
+    else:
+        feed_imports()
+
 
-    # Fire event to save the document
-    event_data = {
+# Skip a changed file that is still being imported, a second job for the same file would take a second slot
+def has_active_job(job: dict) -> bool:
+    if import_scheduler.has_job(job['key']):
+        active = True
+    else:
+        stored = job_store.get(job['key'])
+        active = stored is not None and stored['state'] not in importutils.FINISHED_STATES
+    if active:
+        futil.log('**********Still importing %s, the change is skipped', adsk.core.LogLevels.WarningLogLevel,
+                  args=(job['key'],))
+    return active
+
+
+# Skip the files that don't have to be imported, their results are recorded straight away
+def filter_jobs(jobs):
+    if config.USE_MANIFEST_CACHE:
+        jobs = (job for job in jobs if not answer_from_manifest(job))
+
+    if config.NAME_COLLISION == 'skip':
+        jobs = (job for job in jobs if not answer_from_target_folder(job))
+
+    if config.VALIDATE_STEP_FILES:
+        jobs = (job for job in jobs if passes_preflight(job))
+
+    if config.DEDUPLICATE_FILES:
+        jobs = (job for job in jobs if not is_duplicate(job))
+
+    return jobs
+
+
+# Watch a folder and import new and changed files once they have settled, until stop_watching is called
+def start_watching(folder: str):
+    global folder_watcher, last_full_scan
+    folder_watcher = importutils.FolderWatcher(
+        folder, importutils.format_extensions(config.IMPORT_FORMATS), config.IMPORT_SUBFOLDERS,
+        config.WATCH_SETTLE_SECONDS)
+    last_full_scan = time.monotonic()
+    start_import_run((), keep_open=True)
+
+    watch_timer.interval = config.WATCH_INTERVAL
+    watch_timer.start()
+    app.fireCustomEvent(config.custom_event_id_watch, '')
+    futil.log(f'**********Watching {folder}', force_console=True)
+
+
+# Stop watching, the run finishes once the files already found have been processed
+def stop_watching():
+    global folder_watcher, run_kept_open
+    if folder_watcher is None:
+        return
+    watch_timer.stop()
+    futil.log(f'**********Stopped watching {folder_watcher.root}, {len(folder_watcher)} files found', force_console=True)
+    folder_watcher = None
+    run_kept_open = False
+    finish_run_if_idle()
+
+
+def is_watching() -> bool:
+    return folder_watcher is not None
+
+
+# Rescan the watched folder and add the files that are new or changed and have settled to the run
+def handle_watch(args: adsk.core.CustomEventArgs):
+    global last_full_scan
+    if folder_watcher is None:
+        return
+
+    now = time.monotonic()
+    full = bool(config.WATCH_FULL_RESCAN_INTERVAL) and now - last_full_scan >= config.WATCH_FULL_RESCAN_INTERVAL
+    if full:
+        last_full_scan = now
+    started = time.perf_counter()
+    watched_files = folder_watcher.scan(full)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    jobs = [job_from_watched_file(watched) for watched in watched_files]
+    jobs = [job for job in jobs if importutils.in_shard(job['key'], config.SHARD_INDEX, config.SHARD_COUNT)]
+    if jobs or full:
+        futil.log('**********Watch scan: %d new files, %d settling, %d folders listed in %.1f ms',
+                  args=(len(jobs), folder_watcher.settling_count, folder_watcher.folders_listed, elapsed_ms))
+    if jobs:
+        add_to_import_run(jobs)
+
+
+def job_from_watched_file(watched: importutils.WatchedFile) -> dict:
+    file_name, extension = os.path.splitext(watched.name)
+    return {
+        'key': f'{watched.relative_folder}/{watched.name}' if watched.relative_folder else watched.name,
         'file_name': file_name,
-        'file_path': file_path
+        'file_path': watched.path,
+        'format': importutils.format_of(watched.name, config.IMPORT_FORMATS),
+        'folder': watched.relative_folder,
+        'size': watched.size,
+        'mtime': watched.mtime / 1e9
     }
-    additional_info = json.dumps(event_data)
-    app.fireCustomEvent(config.custom_event_id_save, additional_info)
 
 
-# Save a specific Document
-def handle_save(args: adsk.core.CustomEventArgs):
-    event_data = json.loads(args.additionalInfo)
+# Record the result of a previous run for an unchanged file, returns False if it has to be imported
+def answer_from_manifest(job: dict) -> bool:
+    try:
+        entry = import_manifest.lookup(job['file_path'])
+    except OSError:
+        return False
+    if entry is None:
+        return False
+
+    futil.log('**********Unchanged since last run: %s', args=(job['key'],))
+    result = {
+        'Name': entry['name'],
+        'URN': entry['urn'],
+        'Link': entry['link']
+    }
+    # A new copy of this file in the folder can use the same result
+    job['hash'] = entry['hash']
+    record_result(result, job, 'cached')
+    return True
+
+
+# Record the design already in the target folder with the name of a file, returns False if it has to be imported
+def answer_from_target_folder(job: dict) -> bool:
+    file_id = target_folders.names(job.get('folder', '')).get(job['file_name'])
+    if not file_id:
+        return False
+
+    try:
+        data_file = app.data.findFileById(file_id)
+        result = {
+            'Name': data_file.name,
+            'URN': data_file.versionId,
+            'Link': data_file.publicLink
+        }
+    except:
+        futil.handle_error(f"Unable to use the existing design for {job['key']}")
+        return False
+
+    futil.log('**********Already in the target folder: %s', args=(job['key'],))
+    record_result(result, job, 'existing')
+    remember_in_manifest(job, result)
+    return True
+
+
+# Check the STEP header before using an import slot, returns False and records the reason for a bad file
+def passes_preflight(job: dict) -> bool:
+    if job.get('format') != 'step':
+        return True
+
+    reason = importutils.validate_step_file(job['file_path'])
+    if reason is None:
+        return True
+
+    futil.log('**********Rejected %s: %s', adsk.core.LogLevels.WarningLogLevel, args=(job['key'], reason))
+    record_result({
+        'Name': job['file_name'],
+        'URN': '',
+        'Link': '',
+        'Error': reason
+    }, job, 'rejected')
+    return False
+
+
+# Check if a file with the same content is already part of this run, returns False for the first one
+def is_duplicate(job: dict) -> bool:
+    try:
+        job['hash'] = importutils.file_hash(job['file_path'])
+    except OSError:
+        return False
+
+    primary = job_store.find_by_hash(job['hash'])
+    if primary is None or primary['key'] == job['key']:
+        job_store.add(job, 'queued')
+        return False
+
+    futil.log('**********Duplicate of %s: %s', args=(primary['key'], job['key']))
+    if primary['state'] in importutils.FINISHED_STATES:
+        record_duplicate({'URN': primary['urn'] or '', 'Link': primary['link'] or '', 'Error': primary['error']}, job)
+    else:
+        # The first file is still being processed, the result is recorded when it is done
+        job_store.add(job, 'waiting')
+    return True
+
+
+# Give every duplicate of a file the result of that file
+def resolve_duplicates(job: dict, result: dict):
+    if not job.get('hash'):
+        return
+    for duplicate_job in job_store.jobs('waiting', content_hash=job['hash']):
+        record_duplicate(result, duplicate_job)
+
+
+def record_duplicate(result: dict, job: dict):
+    result = {**result, 'Name': job['file_name']}
+    if result.get('Error'):
+        record_result(result, job, 'failed')
+        return
+
+    record_result(result, job, 'duplicate')
+    remember_in_manifest(job, result)
+
+
+# Remember a file so the next run can skip it if it doesn't change
+def remember_in_manifest(job: dict, result: dict):
+    if config.USE_MANIFEST_CACHE and job.get('file_path'):
+        try:
+            import_manifest.record(job['file_path'], result['Name'], result['URN'], result['Link'], job.get('hash'))
+        except OSError:
+            futil.handle_error('import_manifest.record')
+
+
+# Fire import events for queued files while there are free document slots
+def feed_imports():
+    if not memory_allows_imports():
+        return
+
+    while True:
+        event_data = import_scheduler.next_job()
+        if event_data is None:
+            break
+        start_import(event_data)
+
+    futil.log('**********Import scheduler: %s', args=(import_scheduler,))
+
+
+# Take the slot of a job and queue its import
+def start_import(event_data: dict):
+    mark_stage(event_data['key'], 'dispatched')
+    # The watchdog gives up on the file if its import step is lost, each later stage sets its own timeout
+    job_store.add(event_data, 'dispatched', retry_at=time.time() + config.COMPLETE_TIMEOUT)
+    post_work(handle_import, event_data)
+
+
+# Check the memory used by Fusion before starting imports, returns False while imports are paused
+def memory_allows_imports() -> bool:
+    was_paused = memory_governor.paused
+    allowed = memory_governor.allow_imports()
+
+    if not allowed and not was_paused:
+        futil.log(f'**********Imports paused, memory at {memory_governor.last_mb:.0f} MB is above '
+                  f'{memory_governor.high_mb} MB, {import_scheduler.open_count} documents open',
+                  adsk.core.LogLevels.WarningLogLevel)
+    elif allowed and was_paused:
+        futil.log(f'**********Imports resumed after {memory_governor.last_pause:.1f} s, memory at '
+                  f'{memory_governor.last_mb or 0:.0f} MB', adsk.core.LogLevels.WarningLogLevel)
+
+    if not allowed and import_scheduler.open_count == 0:
+        # None of the documents of the run are open, waiting won't free memory so import the next file
+        futil.log(f'**********Memory at {memory_governor.last_mb:.0f} MB with no documents open, '
+                  f'importing the next file', adsk.core.LogLevels.WarningLogLevel)
+        next_job = import_scheduler.next_job()
+        if next_job is not None:
+            start_import(next_job)
+    return allowed
+
+
+# Queue a step for a job and make sure a dispatch event is on its way to run it
+def post_work(step, job: dict):
+    global dispatch_pending
+    work_queue.append((step, job))
+    queued_steps[job['key']] += 1
+    if not dispatch_pending:
+        dispatch_pending = True
+        app.fireCustomEvent(config.custom_event_id_dispatch, '')
+
+
+# Run queued steps until the time budget is used up, then post another event so Fusion can handle
+# user input in between. At least one step is run for every event.
+def handle_dispatch(args: adsk.core.CustomEventArgs):
+    global dispatch_pending
+    dispatch_pending = False
+
+    deadline = time.perf_counter() + config.DISPATCH_BUDGET_MS / 1000
+    steps = 0
+    while work_queue:
+        step, job = work_queue.popleft()
+        queued_steps[job['key']] -= 1
+        if not queued_steps[job['key']]:
+            del queued_steps[job['key']]
+        started = time.perf_counter()
+        try:
+            step(job)
+        except:
+            futil.handle_error(step.__name__)
+        steps += 1
+        now = time.perf_counter()
+        if config.PROFILE_HANDLERS:
+            futil.record_call(step.__name__, now - started)
+        if now >= deadline:
+            break
+
+    if work_queue and not dispatch_pending:
+        dispatch_pending = True
+        app.fireCustomEvent(config.custom_event_id_dispatch, '')
+
+    futil.log('**********Dispatch ran %d steps, %d waiting', args=(steps, len(work_queue)))
+
+
+# Import a document from the list
+def handle_import(event_data: dict):
+    key = event_data['key']
     file_name = event_data['file_name']
+    file_path = event_data['file_path']
+
+    if not job_in_state(key, 'dispatched'):
+        # The file was given up on while this step was queued, nothing was opened for it
+        release_slot(key, 'failed')
+        return
+
+    futil.log('**********Importing: %s', args=(key,))
+    mark_stage(key, 'import_start')
+
+    # Execute the Fusion 360 import into a new document
+    try:
+        import_manager = app.importManager
+        import_options = importutils.create_import_options(import_manager, event_data['format'], file_path)
+        new_document = import_manager.importToNewDocument(import_options)
+    except:
+        # Nothing was opened, give the slot to the next file
+        futil.handle_error(f'Import failed: {key}')
+        result = {
+            'Name': file_name,
+            'URN': '',
+            'Link': '',
+            'Error': 'Import failed'
+        }
+        record_result(result, event_data, 'failed')
+        resolve_duplicates(event_data, result)
+        release_slot(key, 'failed')
+        return
+
+    mark_stage(key, 'imported')
+
+    # Keep track of imported files, the watchdog gives up on the file if it isn't saved in time
+    config.imported_documents[key] = new_document
+    job_store.update(key, state='imported', retry_at=time.time() + config.COMPLETE_TIMEOUT)
+
+    # Save the document in a later step
+    post_work(handle_save, event_data)
 
-    futil.log(f'**********Saving: {file_name}')
 
-    new_document = config.imported_documents[file_name]
-    new_document.saveAs(file_name, config.target_data_folder, 'Imported from script', 'tag')
+# Save a specific Document
+def handle_save(job: dict):
+    key = job['key']
+    file_name = job['file_name']
+
+    new_document = config.imported_documents.get(key)
+    if new_document is None or not job_in_state(key, 'imported'):
+        # The file was given up on while this step was queued, its close step is queued as well
+        return
+
+    futil.log('**********Saving: %s', args=(key,))
+
+    # Save into the cloud folder matching the sub folder the file came from
+    folder = job.get('folder', '')
+    data_folder = target_folders.get(folder)
+    if config.NAME_COLLISION == 'rename':
+        file_name = target_folders.unique_name(folder, file_name)
+
+    try:
+        new_document.saveAs(file_name, data_folder, 'Imported from script', 'tag')
+    except:
+        # Close the document so its slot goes to the next file
+        futil.handle_error(f'Save failed: {key}')
+        job['error'] = 'Save failed'
+        give_up(job)
+        return
+    mark_stage(key, 'saved')
+
+    # Store the id of the data file so the dataFileComplete event can find the job directly
+    try:
+        file_id = new_document.dataFile.id
+    except:
+        file_id = None
+        futil.log('**********No data file id for: %s, will match by name', args=(key,))
+    target_folders.add_name(folder, file_name, file_id)
+
+    # The watchdog checks the file if it has no share link by then
+    job_store.update(key, state='saved', file_name=file_name, file_id=file_id, attempts=0,
+                     retry_at=time.time() + config.COMPLETE_TIMEOUT)
 
 
 # Close a specific document
-def handle_close(args: adsk.core.CustomEventArgs):
-    event_data = json.loads(args.additionalInfo)
-    file_name = event_data['file_name']
+def handle_close(job: dict):
+    key = job['key']
 
-    futil.log(f'**********Closing: {file_name}')
+    futil.log('**********Closing: %s', args=(key,))
 
-    new_document = config.imported_documents.pop(file_name, False)
+    new_document = config.imported_documents.pop(key, False)
     if new_document:
-        new_document.close(False)
+        try:
+            new_document.close(False)
+            mark_stage(key, 'closed')
+        finally:
+            # The slot is given back even if closing failed, otherwise the run never finishes
+            release_slot(key, job.get('state', 'linked'))
 
 
 # Function to be executed by the dataFileComplete event.
 def handle_data_file_complete(args: adsk.core.DataEventArgs):
-    futil.log(f'***In application_data_file_complete event handler for: {args.file.name}')
+    api_calls.reset()
+    data_file: adsk.core.DataFile = api_calls.wrap(args.file)
+    api_calls.add()
+
+    # The name is read anyway to find the job, the log message is only formatted if it is written
+    file_name = data_file.name
+    futil.log('***In application_data_file_complete event handler for: %s', args=(file_name,))
+
+    # Only the file of this event is processed, other pending files get their own event
+    process_data_file(data_file)
+
+    futil.log('**********dataFileComplete used %d API calls', args=(api_calls.reset(),))
+
+
+# Find the job of a pending file imported by this add-in, None if the data file is not one of ours
+def find_pending_job(data_file: adsk.core.DataFile):
+    # Fall back to the name in case the id was not available after saving
+    return job_store.find(file_id=data_file.id, file_name=data_file.name)
 
-    # Get the dataFile and process it
-    # data_file: adsk.core.DataFile = args.file
-    # process_data_file(data_file)
 
-    document: adsk.core.Document
-    for file_name, document in config.imported_documents.items():
-        if document.isValid:
-            if document.dataFile.isComplete:
-                process_data_file(document.dataFile)
-                # document.close(False)
+# Data file of a saved job, from its open document or by its id if the document has been closed
+def find_data_file(job: dict):
+    document = config.imported_documents.get(job['key'])
+    if document and document.isValid:
+        return document.dataFile
+    if job.get('file_id'):
+        return app.data.findFileById(job['file_id'])
+    return None
 
 
-def process_data_file(data_file: adsk.core.DataFile):
+# Create the share link of a complete data file imported by this add-in, returns True if a link was created
+def process_data_file(data_file: adsk.core.DataFile) -> bool:
     # Make sure we are processing a file imported from this script
-    if data_file.name in config.imported_filenames:
+    job = find_pending_job(data_file)
+    if job is not None:
+        key = job['key']
+        mark_stage(key, 'complete')
         try:
             # Create the public link for the data file
             public_link = data_file.publicLink
-            futil.log(f"**********Created public link for {data_file.name}: {public_link}")
+            mark_stage(key, 'linked')
+            futil.log('**********Created public link for %s: %s', args=(key, public_link))
 
             # Store the result of this file
-            config.results.append({
+            result = {
                 'Name': data_file.name,
                 'URN': data_file.versionId,
                 'Link': public_link
-            })
-
-            config.imported_filenames.remove(data_file.name)
-
-            # Fire close event for this Document
-            event_data = {
-                'file_name': data_file.name,
             }
-            additional_info = json.dumps(event_data)
-            app.fireCustomEvent(config.custom_event_id_close, additional_info)
+            record_result(result, job, 'linked')
+            remember_in_manifest(job, result)
+            resolve_duplicates(job, result)
+
+            # Close this Document in a later step
+            post_work(handle_close, job)
+            return True
 
         except:
             futil.handle_error('process_data_file')
 
-        # If all documents have been processed finalize results
-        if len(config.imported_filenames) == 0:
-            if not config.run_finished:
-                config.run_finished = True
-                write_results()
+            # Let the watchdog try again soon instead of waiting for the full timeout
+            fields = {'error': 'Share link could not be created'}
+            if job['retry_at'] is not None:
+                fields['retry_at'] = min(job['retry_at'], time.time() + config.RETRY_DELAY)
+            job_store.update(key, **fields)
     else:
         # futil.log(f"**********Already processed: {data_file.name}")
         ...
+    return False
+
+
+# Check files that have been waiting too long for their share link, retry them or give up
+def handle_watchdog(args: adsk.core.CustomEventArgs):
+    if config.AUTO_CLOSE:
+        auto_close_documents()
+
+    # Check again if paused imports can be resumed
+    if memory_governor.paused:
+        feed_imports()
+
+    now = time.time()
+
+    # Files that were never saved, for example because their import or save step was lost, are not retried.
+    # A file whose step is still waiting in the work queue isn't stuck, its timeout starts when the step has run.
+    for state in ('dispatched', 'imported'):
+        for job in job_store.jobs(state, due_before=now):
+            if queued_steps[job['key']]:
+                continue
+            job['error'] = 'Timed out before the file was saved'
+            give_up(job)
+
+    for job in job_store.jobs('saved', due_before=now):
+        key = job['key']
+        job['attempts'] += 1
+        futil.log('**********Watchdog checking %s, attempt %d of %d',
+                  args=(key, job['attempts'], config.MAX_LINK_ATTEMPTS))
+
+        data_file = find_data_file(job)
+        if data_file and data_file.isComplete:
+            if process_data_file(data_file):
+                continue
+            job['error'] = 'Share link could not be created'
+        else:
+            job['error'] = 'Timed out waiting for the data file to be complete'
+
+        if job['attempts'] >= config.MAX_LINK_ATTEMPTS:
+            give_up(job)
+        else:
+            job_store.update(key, attempts=job['attempts'], error=job['error'],
+                             retry_at=now + config.RETRY_DELAY * 2 ** (job['attempts'] - 1))
+
+
+# Close finished documents in a batch if too many documents are open or Fusion uses too much memory
+def auto_close_documents():
+    open_documents = app.documents.count
+    rss_mb = importutils.process_rss_mb() if config.AUTO_CLOSE_RSS_MB else None
+    if config.AUTO_CLOSE_OPEN_DOCUMENTS and open_documents > config.AUTO_CLOSE_OPEN_DOCUMENTS:
+        reason = f'{open_documents} documents open'
+    elif rss_mb is not None and rss_mb > config.AUTO_CLOSE_RSS_MB:
+        reason = f'{rss_mb:.0f} MB used'
+    else:
+        return
+
+    closed = close_finished_documents(config.AUTO_CLOSE_BATCH)
+    futil.log('**********Auto close, %s: closed %d documents', args=(reason, closed))
+
+
+# Close open documents imported by this add-in whose data file is complete, at most limit of them.
+# Files of the run that have no share link yet get it first and are closed by their close step.
+# Documents that were not imported by this add-in are never closed. Returns the number of documents closed.
+def close_finished_documents(limit: int = None) -> int:
+    closed = 0
+    for document in list(app.documents):
+        if limit is not None and closed >= limit:
+            break
+
+        data_file = document.dataFile
+        if not data_file or not data_file.isComplete:
+            continue
+
+        job = job_store.find_by_file_id(data_file.id)
+        if job is None:
+            # Documents of files shared by an earlier run can still be open
+            if not job_store.is_shared(data_file.versionId):
+                continue
+        elif job['state'] in ('imported', 'saved'):
+            config.imported_documents.setdefault(job['key'], document)
+            if process_data_file(data_file):
+                closed += 1
+            continue
+        elif job['key'] in config.imported_documents:
+            # Its close step is already queued
+            continue
+
+        document.close(False)
+        closed += 1
+    return closed
+
+
+# Mark a file that could not be linked as failed and close its document to free the slot
+def give_up(job: dict):
+    futil.log('**********Giving up on %s: %s', adsk.core.LogLevels.WarningLogLevel, args=(job['key'], job['error']))
+    result = {
+        'Name': job['file_name'],
+        'URN': '',
+        'Link': '',
+        'Error': job['error']
+    }
+    record_result(result, job, 'failed')
+    resolve_duplicates(job, result)
+
+    if job['key'] in config.imported_documents:
+        post_work(handle_close, job)
+    elif not queued_steps[job['key']]:
+        # No document is open for the file, give its slot to the next file straight away. A queued
+        # step of the file gives the slot back when it runs.
+        release_slot(job['key'], 'failed')
+
+
+# True if the job with the given key is still in the state its queued step expects
+def job_in_state(key: str, state: str) -> bool:
+    stored = job_store.get(key)
+    return stored is not None and stored['state'] == state
+
+
+# Give the slot of a file that has left the pipeline to the next file
+def release_slot(key: str, status: str):
+    finish_stages(key, status)
+    import_scheduler.release(key)
+    feed_imports()
+    finish_run_if_idle()
+
+
+# Record that a file reached a stage of the pipeline
+def mark_stage(key: str, stage: str):
+    if config.TRACE_TIMINGS:
+        lifecycle_trace.mark(key, stage)
+
+
+# Write the timings of a file that has left the pipeline
+def finish_stages(key: str, status: str = 'linked'):
+    if config.TRACE_TIMINGS:
+        lifecycle_trace.finish(key, status)
+
+
+# Store the result of a file and record it on disk right away so it survives a crash
+def record_result(result: dict, job: dict, status: str):
+    result['Status'] = status
+    result['Path'] = job.get('file_path')
+    result['Folder'] = job.get('folder')
+    result['Size'] = job.get('size')
+    if status in ('linked', 'duplicate'):
+        result['Time To Link'] = round(time.monotonic() - run_started, 3)
+    results_journal.append(result)
+    write_to_sinks(result)
+
+    job['state'] = status
+    job_store.add(job, status, urn=result.get('URN'), link=result.get('Link'), error=result.get('Error'),
+                  time_to_link=result.get('Time To Link'))
+    if result.get('URN') and result.get('Link'):
+        job_store.add_shared(result['URN'], result['Link'])
+
+
+# Open the configured outputs, append adds to the outputs of the previous run
+def open_result_sinks(append: bool = False):
+    close_result_sinks()
+    file_names = {
+        'csv': config.csv_file_name,
+        'jsonl': config.jsonl_file_name,
+        'sqlite': config.sqlite_file_name,
+    }
+    for kind in config.RESULT_SINKS:
+        try:
+            result_sinks.append(importutils.open_sink(
+                kind, file_names[kind], config.RESULT_COLUMNS, config.RESULT_BATCH_SIZE, append))
+        except:
+            futil.handle_error(f'Unable to open {kind} output')
 
 
-# After all files are processed write the results
+def write_to_sinks(result: dict):
+    for sink in result_sinks:
+        try:
+            sink.write(result)
+        except:
+            futil.handle_error(f'Unable to write to {sink.path}')
+
+
+def flush_result_sinks():
+    for sink in result_sinks:
+        try:
+            sink.flush()
+        except:
+            futil.handle_error(f'Unable to write to {sink.path}')
+
+
+def close_result_sinks():
+    while result_sinks:
+        sink = result_sinks.pop()
+        try:
+            sink.close()
+        except:
+            futil.handle_error(f'Unable to close {sink.path}')
+
+
+# If all files have been imported and their documents closed finalize results
+# A run kept open for a watched folder only writes the results so far and waits for more files
+def finish_run_if_idle():
+    if not import_scheduler.is_idle:
+        return
+    if run_kept_open:
+        flush_result_sinks()
+        if config.USE_MANIFEST_CACHE:
+            import_manifest.save()
+    else:
+        finish_run()
+
+
+def finish_run():
+    if not job_store.run_finished:
+        job_store.finish_run()
+        watchdog_timer.stop()
+        futil.log(f'**********Run finished, peak open documents: {import_scheduler.peak_open}, '
+                  f'files by state: {job_store.counts()}')
+        if memory_governor.enabled:
+            memory_governor.resume()
+            futil.log(f'**********Imports paused {memory_governor.pauses} times for '
+                      f'{memory_governor.paused_seconds:.1f} s because of memory', force_console=True)
+        links, mean_time, p95_time = job_store.link_time_summary(95)
+        futil.log(f'**********Import order {config.IMPORT_ORDER}: {links} links, '
+                  f'mean time to link {mean_time:.2f} s, p95 {p95_time:.2f} s', force_console=True)
+        results_journal.close()
+        if config.TRACE_TIMINGS:
+            lifecycle_trace.close()
+            futil.log(f'**********Timings in seconds\n{lifecycle_trace.summary()}', force_console=True)
+        if config.PROFILE_HANDLERS:
+            futil.log(f'**********Time in event handlers and steps\n{futil.profile_summary()}', force_console=True)
+        if config.USE_MANIFEST_CACHE:
+            import_manifest.save()
+        write_results()
+
+
+# After all files are processed write the remaining results and close the outputs
 def write_results():
-    futil.log(f"Writing CSV")
-    with open(config.csv_file_name, mode='w') as csv_file:
-        fieldnames = ['Name', 'URN', 'Link']
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in config.results:
-            writer.writerow(row)
+    futil.log(f"Writing results")
+    close_result_sinks()
 
 
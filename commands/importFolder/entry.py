@@ -1,79 +1,22 @@
-import json
 import time
 
 import adsk.core
 import os
+from ..dataFileComplete.entry import start_import_run, is_watching
 from ...lib import fusion360utils as futil
+from ...lib import importutils
 from ... import config
 app = adsk.core.Application.get()
 ui = app.userInterface
 
-# Set Command name and description
-CMD_NAME = 'Import Folder'
-CMD_Description = 'Import a folder of STEP files and create share links'
-
-# Command ID must be unique relative to other commands in Fusion 360
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = True
-
-# This is done by specifying the workspace, the tab, and the panel, and the
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment'
-PANEL_ID = 'SolidScriptsAddinsPanel'
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+# Name of the command, the button is created from the description in __init__.py
+from . import CMD_NAME
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
 
-# Executed when add-in is run.
-# Typically don't need to change anything here.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-
-    # Get the panel the button will be created in.
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-# Typically don't need to change anything here.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
-
-
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
@@ -95,6 +38,10 @@ def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     futil.log(f'{CMD_NAME} Command Execute Event')
 
+    if is_watching():
+        ui.messageBox('A folder is being watched, click Watch Folder to stop watching it before importing a folder.')
+        return
+
     # Have User select a folder containing STEP Files to be imported
     folder_dialog = ui.createFolderDialog()
     folder_dialog.title = "Select Folder"
@@ -114,25 +61,39 @@ def command_execute(args: adsk.core.CommandEventArgs):
                       "For example, can't be in recent documents.")
         return
 
-    config.results = []
-    config.run_finished = False
-
-    # Iterate over all STEP files in user selected directory
-    for full_file_name in os.listdir(folder):
-        file_path = os.path.join(folder, full_file_name)
-        if os.path.isfile(file_path):
-            split_tup = os.path.splitext(full_file_name)
-            file_name = split_tup[0]
-            file_extension = split_tup[1]
-            if file_extension in config.EXTENSION_TYPES:
-
-                event_data = {
-                    'file_name': file_name,
-                    'file_path': file_path
-                }
-                # config.imported_filenames.append(file_name)
-                additional_info = json.dumps(event_data)
-                app.fireCustomEvent(config.custom_event_id_import, additional_info)
+    try:
+        importutils.check_shard(config.SHARD_INDEX, config.SHARD_COUNT)
+    except ValueError as error:
+        ui.messageBox(f'{error}, check SHARD_INDEX and SHARD_COUNT in config.py')
+        return
+    if config.SHARD_COUNT > 1:
+        futil.log(f'{CMD_NAME}: importing shard {config.SHARD_INDEX} of {config.SHARD_COUNT}', force_console=True)
+
+    # Files are read from the folder as they are needed and imported a few at a time
+    start_import_run(find_import_jobs(folder))
+
+
+# Iterate over all files of the import formats in user selected directory and its sub folders
+# Only the files of this session's shard are returned when the folder is split between sessions
+def find_import_jobs(folder: str):
+    extensions = importutils.format_extensions(config.IMPORT_FORMATS)
+    for relative_folder, entry in importutils.walk_files(folder, extensions, config.IMPORT_SUBFOLDERS):
+        key = f'{relative_folder}/{entry.name}' if relative_folder else entry.name
+        if not importutils.in_shard(key, config.SHARD_INDEX, config.SHARD_COUNT):
+            continue
+
+        file_name, extension = os.path.splitext(entry.name)
+        stat = entry.stat()
+        event_data = {
+            'key': key,
+            'file_name': file_name,
+            'file_path': entry.path,
+            'format': extensions[extension.lower()],
+            'folder': relative_folder,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime
+        }
+        yield event_data
 
 
 # This event handler is called when the command terminates.
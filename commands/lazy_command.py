@@ -0,0 +1,66 @@
+import importlib
+
+import adsk.core
+from ..lib import fusion360utils as futil
+
+
+class LazyCommand:
+    """A button command whose implementation is only imported when the button is clicked.
+
+    The button is created from the static description in the command package's __init__.py
+    (CMD_ID, CMD_NAME, ICON_FOLDER, ...). The package's entry module is imported the first time
+    commandCreated fires and the event is passed on to its command_created function. It has the
+    same start and stop functions as an entry module, so it can be used in the list of commands.
+
+    Arguments:
+    package -- Name of the command's package in the commands folder, for example 'closeAll'.
+    """
+
+    def __init__(self, package: str):
+        self.package = package
+        self.metadata = importlib.import_module(f'.{package}', __package__)
+        self.CMD_ID = self.metadata.CMD_ID
+        self.CMD_NAME = self.metadata.CMD_NAME
+        self.entry = None
+
+    def load(self):
+        """Imports the entry module of the command if it hasn't been imported yet and returns it."""
+        if self.entry is None:
+            self.entry = importlib.import_module(f'.{self.package}.entry', __package__)
+        return self.entry
+
+    def start(self):
+        metadata = self.metadata
+        ui = adsk.core.Application.get().userInterface
+
+        # Create a command Definition.
+        cmd_def = ui.commandDefinitions.addButtonDefinition(
+            metadata.CMD_ID, metadata.CMD_NAME, metadata.CMD_Description, metadata.ICON_FOLDER)
+
+        # Define an event handler for the command created event. It will be called when the button is clicked.
+        futil.add_handler(cmd_def.commandCreated, self.command_created, name=metadata.CMD_NAME)
+
+        # Create the button command control in the UI after the specified existing command.
+        workspace = ui.workspaces.itemById(metadata.WORKSPACE_ID)
+        panel = workspace.toolbarPanels.itemById(metadata.PANEL_ID)
+        control = panel.controls.addCommand(cmd_def, metadata.COMMAND_BESIDE_ID, False)
+        control.isPromoted = metadata.IS_PROMOTED
+
+    def stop(self):
+        metadata = self.metadata
+        ui = adsk.core.Application.get().userInterface
+        workspace = ui.workspaces.itemById(metadata.WORKSPACE_ID)
+        panel = workspace.toolbarPanels.itemById(metadata.PANEL_ID)
+        command_control = panel.controls.itemById(metadata.CMD_ID)
+        command_definition = ui.commandDefinitions.itemById(metadata.CMD_ID)
+
+        # Delete the button command control
+        if command_control:
+            command_control.deleteMe()
+
+        # Delete the command definition
+        if command_definition:
+            command_definition.deleteMe()
+
+    def command_created(self, args: adsk.core.CommandCreatedEventArgs):
+        self.load().command_created(args)
@@ -1,78 +1,19 @@
 import adsk.core
-import os
 
-from ..dataFileComplete.entry import process_data_file
+from ..dataFileComplete import entry as complete
 from ...lib import fusion360utils as futil
 from ... import config
 app = adsk.core.Application.get()
 ui = app.userInterface
 
-# Set Command name and description
-CMD_NAME = 'Process Remaining'
-CMD_Description = 'Processes any documents that were missed last time'
-
-# Command ID must be unique relative to other commands in Fusion 360
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = True
-
-# This is done by specifying the workspace, the tab, and the panel, and the
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment'
-PANEL_ID = 'SolidScriptsAddinsPanel'
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+# Name of the command, the button is created from the description in __init__.py
+from . import CMD_NAME
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
 
-# Executed when add-in is run.
-# Typically don't need to change anything here.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-
-    # Get the panel the button will be created in.
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-# Typically don't need to change anything here.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
-
-
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
@@ -94,13 +35,53 @@ def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     futil.log(f'{CMD_NAME} Command Execute Event')
 
-    all_docs = [document for document in app.documents]
-
-    doc: adsk.core.Document
-    for doc in all_docs:
-        data_file = doc.dataFile
-        if data_file and data_file.isComplete:
-            process_data_file(data_file)
+    # Outside of a run the results are added to the end of the outputs of the last run, the journal
+    # is only open while a run is in progress in this session
+    in_run = complete.results_journal.is_open
+    if not in_run:
+        complete.open_result_sinks(append=True)
+
+    processed = 0
+    skipped = 0
+
+    # Open documents, versions that already have a share link are skipped without asking Fusion for it
+    checked_keys = set()
+    for document in list(app.documents):
+        data_file = document.dataFile
+        if not data_file or complete.job_store.is_shared(data_file.versionId):
+            skipped += 1
+            continue
+
+        # Only documents imported by this add-in that are still waiting for their share link
+        job = complete.find_pending_job(data_file)
+        if job is None or not data_file.isComplete:
+            skipped += 1
+            continue
+
+        # Close the document once it has its link, also if it was opened before the add-in was restarted
+        checked_keys.add(job['key'])
+        config.imported_documents.setdefault(job['key'], document)
+        if complete.process_data_file(data_file):
+            processed += 1
+
+    # Files of the run waiting for their share link whose document isn't open anymore, for example after a restart
+    for job in complete.job_store.jobs('saved'):
+        if job['key'] in checked_keys:
+            continue
+        data_file = complete.find_data_file(job)
+        if data_file and data_file.isComplete and complete.process_data_file(data_file):
+            processed += 1
+        else:
+            skipped += 1
+
+    # Write the new results now instead of at the end of the run
+    if in_run:
+        complete.flush_result_sinks()
+    else:
+        complete.close_result_sinks()
+        complete.results_journal.close()
+
+    futil.log(f'{CMD_NAME}: {processed} share links created, {skipped} documents skipped', force_console=True)
 
 
 # This event handler is called when the command terminates.
@@ -0,0 +1,25 @@
+# Static description of the command. It is read when the add-in starts to create the button,
+# entry.py with the implementation is only imported the first time the button is clicked.
+import os
+
+from ... import config
+
+# Set Command name and description
+CMD_NAME = 'Watch Folder'
+CMD_Description = 'Watch a folder and import new and changed files as they arrive, click again to stop watching'
+
+# Command ID must be unique relative to other commands in Fusion 360
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_{CMD_NAME}'
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = True
+
+# This is done by specifying the workspace, the tab, and the panel, and the
+# command it will be inserted beside. Not providing the command to position it
+# will insert it at the end.
+WORKSPACE_ID = 'FusionSolidEnvironment'
+PANEL_ID = 'SolidScriptsAddinsPanel'
+COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
@@ -0,0 +1,85 @@
+import adsk.core
+from ..dataFileComplete import entry as complete
+from ...lib import fusion360utils as futil
+from ...lib import importutils
+from ... import config
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+# Name of the command, the button is created from the description in __init__.py
+from . import CMD_NAME
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# This defines the contents of the command dialog and connects to the command related events.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} Command Created Event')
+
+    # This command will auto-execute.
+    # Meaning it will not create a command dialog for user input
+    args.command.isAutoExecute = True
+
+    # Add handlers for the execute and destroy events of the command
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This event handler is called when the user clicks the OK button in the command dialog or 
+# is immediately called after the created event not command inputs were created for the dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} Command Execute Event')
+
+    # Clicking the button while a folder is watched stops watching it
+    if complete.is_watching():
+        answer = ui.messageBox(f'Stop watching {complete.folder_watcher.root}?', CMD_NAME,
+                               adsk.core.MessageBoxButtonTypes.YesNoButtonType)
+        if answer == adsk.core.DialogResults.DialogYes:
+            complete.stop_watching()
+        return
+
+    if not complete.import_scheduler.is_idle:
+        ui.messageBox('Files are still being imported, wait for the run to finish before watching a folder.')
+        return
+
+    # Have User select the folder to watch
+    folder_dialog = ui.createFolderDialog()
+    folder_dialog.title = "Select Folder to Watch"
+    dialog_result = folder_dialog.showDialog()
+    if dialog_result == adsk.core.DialogResults.DialogOK:
+        folder = folder_dialog.folder
+    else:
+        return
+
+    # Files are saved to the root folder of the active project like Import Folder does
+    try:
+        config.target_data_folder = app.data.activeProject.rootFolder
+    except:
+        ui.messageBox("You probably are navigated to a project in the data panel. "
+                      "For example, can't be in recent documents.")
+        return
+
+    try:
+        importutils.check_shard(config.SHARD_INDEX, config.SHARD_COUNT)
+    except ValueError as error:
+        ui.messageBox(f'{error}, check SHARD_INDEX and SHARD_COUNT in config.py')
+        return
+
+    # The folder is rescanned every WATCH_INTERVAL seconds until the button is clicked again
+    complete.start_watching(folder)
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    # Clean up event handlers
+    global local_handlers
+    local_handlers = []
+
@@ -20,23 +20,151 @@ COMPANY_NAME = 'Autodesk'
 
 # *********** Global Variables Unique to this Add-in **************
 
-# Keep track of imported files
-imported_filenames = []
-
-# Keep track of imported files
+# Open documents of imported files that are waiting for a share link or to be closed.
+# Imported files are identified by a key, the path of the source file relative to the imported folder.
 imported_documents = {}
 
+# Database with the state, URN, share link and error of every file of the run.
+# It is kept after a run, so Process Remaining can still find the files after Fusion is restarted.
+state_file_name = os.path.join(os.path.dirname(__file__), 'run_state.db')
+
 # Output csv file to record results.
 csv_file_name = os.path.join(os.path.dirname(__file__), 'output.csv')
+jsonl_file_name = os.path.join(os.path.dirname(__file__), 'output.jsonl')
+sqlite_file_name = os.path.join(os.path.dirname(__file__), 'output.db')
 
-# Extension types that will be processed for import
-EXTENSION_TYPES = ['.step', '.stp']
+# Outputs the results are written to while the run progresses, any of 'csv', 'jsonl' and 'sqlite'.
+RESULT_SINKS = ['csv']
 
-custom_event_id_import = 'custom_event_import'
-custom_event_id_save = 'custom_event_id_save'
-custom_event_id_close = 'custom_event_id_close'
+# Columns written to the outputs. Also available: 'Folder' (relative folder), 'Size' (bytes) and 'Time To Link'
+# (seconds from the start of the run until the link was created). 'Path' (source file) is what tells files with
+# the same name in different sub folders apart when outputs are merged with tools/merge_results.py.
+RESULT_COLUMNS = ['Name', 'URN', 'Link', 'Status', 'Error', 'Path']
 
-target_data_folder = None
+# Results are written to the outputs in batches of this many rows
+RESULT_BATCH_SIZE = 100
+
+# Journal of finished files, every result is written to disk as soon as its share link is created.
+journal_file_name = os.path.join(os.path.dirname(__file__), 'output_journal.jsonl')
+
+# Resume the previous run. Files already recorded in the journal are skipped and their
+# results are included in the output. If False the journal is cleared at the start of a run.
+RESUME_RUN = False
+
+# Record when each file is imported, saved, complete, linked and closed.
+# Each file is written as one line to the trace file and a summary is shown at the end of the run.
+TRACE_TIMINGS = True
+trace_file_name = os.path.join(os.path.dirname(__file__), 'output_trace.jsonl')
+
+# Skip files that were imported by a previous run and have not changed since.
+# Their name, URN and share link are taken from the manifest instead.
+USE_MANIFEST_CACHE = True
+manifest_file_name = os.path.join(os.path.dirname(__file__), 'import_manifest.json')
+
+# Formats that will be processed for import: 'step' (.step, .stp), 'iges' (.iges, .igs), 'sat' (.sat),
+# 'smt' (.smt) and 'f3d' (.f3d). Extensions are matched regardless of case.
+IMPORT_FORMATS = ['step', 'iges', 'sat', 'smt', 'f3d']
+
+# Check the header of STEP files before importing them.
+# Files that are not valid or are truncated are not imported, the reason is written to the results.
+VALIDATE_STEP_FILES = True
+
+# Import files with identical content only once.
+# Every copy gets a result with the same URN and share link, marked as a duplicate.
+DEDUPLICATE_FILES = True
+
+# Also import the files in sub folders of the selected folder.
+# The same folder structure is created in the target data folder.
+IMPORT_SUBFOLDERS = True
+
+# What to do if a design with the same name is already in the target folder:
+# 'rename' - save the new design as "name (2)", "name (3)", ...
+# 'skip' - don't import the file, the URN and share link of the existing design are written to the results
+# 'allow' - save another design with the same name
+# The files of each target folder are read once per run, not for every imported file.
+NAME_COLLISION = 'rename'
+
+# Split the files of a folder between SHARD_COUNT Fusion sessions, for example on several machines that import
+# the same network folder. Each session only imports the files of shard SHARD_INDEX (0 to SHARD_COUNT - 1),
+# chosen from a hash of the path of the file relative to the folder, so the sessions don't have to coordinate.
+# Combine the outputs of all shards with tools/merge_results.py, keep 'Path' in RESULT_COLUMNS so it can tell
+# the files apart. SHARD_COUNT = 1 imports every file.
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+
+# Watch Folder imports the files that are added to a folder or change while it is watched, including the files
+# already in it. The folder is rescanned every WATCH_INTERVAL seconds, a file is imported once its size and
+# modification time haven't changed for WATCH_SETTLE_SECONDS so files still being copied are not imported.
+# Only folders whose modification time changed are read again, every folder is read every
+# WATCH_FULL_RESCAN_INTERVAL seconds to also find files overwritten in place (0 turns full rescans off).
+WATCH_INTERVAL = 10
+WATCH_SETTLE_SECONDS = 10
+WATCH_FULL_RESCAN_INTERVAL = 600
 
-results = []
-run_finished = False
+# Order files are imported in:
+# 'fifo' - the order the folder is read in, imports start before the whole folder is read
+# 'size_ascending' - smallest files first, gives the shortest average time until a file has a link
+# 'size_descending' - largest files first
+# 'mtime' - oldest files first
+# 'name' - alphabetical by path
+IMPORT_ORDER = 'fifo'
+
+# Maximum number of imported documents that can be open at the same time.
+# The next file is only imported once a previous document has been closed.
+MAX_OPEN_DOCUMENTS = 10
+
+# Pause starting imports while Fusion uses more than MEMORY_HIGH_WATER_MB of memory and resume once it
+# uses less than MEMORY_LOW_WATER_MB. The memory is checked before each batch of imports is started.
+# Every pause and how long it lasted is logged. 0 turns this off. If MEMORY_LOW_WATER_MB is 0 or not below
+# MEMORY_HIGH_WATER_MB imports resume below 80% of MEMORY_HIGH_WATER_MB.
+MEMORY_HIGH_WATER_MB = 0
+MEMORY_LOW_WATER_MB = 0
+
+# Lower limits on the number of open documents for some formats, for formats with large files that are
+# slow to import and translate. Formats that are not listed are only limited by MAX_OPEN_DOCUMENTS.
+FORMAT_MAX_OPEN = {'iges': 4}
+
+# Watchdog for files whose share link is never created.
+# If a saved file has no share link after COMPLETE_TIMEOUT seconds the watchdog checks it and tries
+# to create the link. Failed checks are retried after RETRY_DELAY seconds, doubling every time.
+# After MAX_LINK_ATTEMPTS the file is marked as failed and its document is closed.
+COMPLETE_TIMEOUT = 120
+RETRY_DELAY = 10
+MAX_LINK_ATTEMPTS = 5
+
+# Seconds between watchdog checks
+WATCHDOG_INTERVAL = 5
+
+# Close the documents of finished files while a run is in progress when more than AUTO_CLOSE_OPEN_DOCUMENTS
+# documents are open in Fusion or Fusion uses more than AUTO_CLOSE_RSS_MB of memory (0 turns a check off).
+# It is checked with the watchdog and at most AUTO_CLOSE_BATCH documents are closed each time.
+# Files whose data file is complete but have no share link yet get their link first.
+AUTO_CLOSE = True
+AUTO_CLOSE_OPEN_DOCUMENTS = 20
+AUTO_CLOSE_RSS_MB = 0
+AUTO_CLOSE_BATCH = 5
+
+# Import, save and close steps are run in batches by one custom event.
+# Each event runs steps for at most this many milliseconds (and at least one step) and then
+# posts itself again, so Fusion stays responsive while a large folder is processed.
+DISPATCH_BUDGET_MS = 50
+
+# Log messages below this level are dropped before they are formatted: 'info', 'warning' or 'error'
+LOG_LEVEL = 'info'
+
+# Log messages are queued and written every LOG_FLUSH_INTERVAL seconds instead of one at a time.
+# If the same message is logged more than LOG_RATE_LIMIT times in a second the repeats are dropped
+# and their number is logged instead, 0 turns rate limiting off. Errors are always written.
+LOG_RATE_LIMIT = 20
+LOG_FLUSH_INTERVAL = 0.5
+
+# Time every event handler and every import, save and close step. A table with the number of calls
+# and the total, max and p99 time of each is written to the Text Command window at the end of a run.
+PROFILE_HANDLERS = False
+
+custom_event_id_dispatch = 'custom_event_id_dispatch'
+custom_event_id_watchdog = 'custom_event_id_watchdog'
+custom_event_id_log = 'custom_event_id_log'
+custom_event_id_watch = 'custom_event_id_watch'
+
+target_data_folder = None
@@ -1,13 +1,29 @@
+import collections
+import math
 import sys
+import time
 from typing import Callable, Union
 
 import adsk.core
 from .general_utils import handle_error
 
+# Attempt to read the PROFILE_HANDLERS flag from parent config when a handler is called.
+try:
+    from ... import config
+except:
+    config = None
+
 
 # Global Variable to hold Event Handlers
 _handlers = []
 
+# Handler types by event type and the handler classes defined for each handler type and name
+_handler_types = {}
+_handler_classes = {}
+
+# Number of calls, total and max time and the time of the last calls of each profiled callback
+_profile = {}
+
 
 def add_handler(
         event: adsk.core.Event,
@@ -32,8 +48,7 @@ def add_handler(
                       to maintain your own handler list so it can be managed 
                       independently for each command.
     """   
-    module = sys.modules[event.__module__]
-    handler_type = module.__dict__[event.add.__annotations__['handler']]
+    handler_type = _handler_type(event)
     handler = _create_handler(handler_type, callback, event, name, local_handlers)
     event.add(handler)
     return handler
@@ -46,6 +61,54 @@ def clear_handlers():
     _handlers = []
 
 
+def record_call(name: str, seconds: float):
+    """Adds the time of one call to the profile of name, see profile_summary.
+
+    Handlers record their callbacks when PROFILE_HANDLERS is True in config, this can be used
+    to profile other functions the same way.
+    """
+    stats = _profile.get(name)
+    if stats is None:
+        stats = _profile[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'recent': collections.deque(maxlen=1000)}
+    stats['count'] += 1
+    stats['total'] += seconds
+    stats['max'] = max(stats['max'], seconds)
+    stats['recent'].append(seconds)
+
+
+def profile_summary() -> str:
+    """Returns a table with the number of calls and the total, max and p99 time in ms of every profiled callback.
+
+    The p99 is taken over the last 1000 calls. Callbacks are sorted by their total time.
+    """
+    lines = [f"{'callback':<32} {'count':>7} {'total ms':>10} {'max ms':>9} {'p99 ms':>9}"]
+    for name, stats in sorted(_profile.items(), key=lambda item: item[1]['total'], reverse=True):
+        recent = sorted(stats['recent'])
+        p99 = recent[min(len(recent) - 1, math.ceil(0.99 * len(recent)) - 1)]
+        lines.append(f"{name:<32} {stats['count']:>7} {stats['total'] * 1000:>10.1f} "
+                     f"{stats['max'] * 1000:>9.2f} {p99 * 1000:>9.2f}")
+    return '\n'.join(lines)
+
+
+def clear_profile():
+    _profile.clear()
+
+
+def profiling_enabled() -> bool:
+    return bool(getattr(config, 'PROFILE_HANDLERS', False))
+
+
+def _handler_type(event: adsk.core.Event):
+    # The handler type of an event is named in the annotation of its add method
+    event_type = type(event)
+    handler_type = _handler_types.get(event_type)
+    if handler_type is None:
+        module = sys.modules[event.__module__]
+        handler_type = module.__dict__[event.add.__annotations__['handler']]
+        _handler_types[event_type] = handler_type
+    return handler_type
+
+
 def _create_handler(
         handler_type,
         callback: Callable,
@@ -53,23 +116,38 @@ def _create_handler(
         name: str = None,
         local_handlers: list = None
 ):
-    handler = _define_handler(handler_type, callback, name)()
+    handler = _define_handler(handler_type, name)(callback)
 
     (local_handlers if local_handlers is not None else _handlers).append(handler)
     return handler
 
 
-def _define_handler(handler_type, callback, name: str = None):
-    name = name or handler_type.__name__
+def _define_handler(handler_type, name: str = None):
+    # One class is defined for each handler type and name, the callback is given to each instance
+    handler_class = _handler_classes.get((handler_type, name))
+    if handler_class is not None:
+        return handler_class
+
+    error_name = name or handler_type.__name__
 
     class Handler(handler_type):
-        def __init__(self):
+        def __init__(self, callback: Callable):
             super().__init__()
+            self.callback = callback
+            self.profile_name = getattr(callback, '__qualname__', error_name)
 
         def notify(self, args):
             try:
-                callback(args)
+                if profiling_enabled():
+                    started = time.perf_counter()
+                    try:
+                        self.callback(args)
+                    finally:
+                        record_call(self.profile_name, time.perf_counter() - started)
+                else:
+                    self.callback(args)
             except:
-                handle_error(name)
+                handle_error(error_name)
 
+    _handler_classes[(handler_type, name)] = Handler
     return Handler
@@ -1,4 +1,6 @@
-import os
+import collections
+import threading
+import time
 import traceback
 import adsk.core
 
@@ -12,27 +14,64 @@ try:
 except:
     DEBUG = False
 
+# Attempt to read the log settings from parent config.
+_LEVELS = {
+    'info': adsk.core.LogLevels.InfoLogLevel,
+    'warning': adsk.core.LogLevels.WarningLogLevel,
+    'error': adsk.core.LogLevels.ErrorLogLevel,
+}
+try:
+    LOG_LEVEL = _LEVELS[config.LOG_LEVEL]
+    LOG_RATE_LIMIT = config.LOG_RATE_LIMIT
+    LOG_FLUSH_INTERVAL = config.LOG_FLUSH_INTERVAL
+    LOG_EVENT_ID = config.custom_event_id_log
+except:
+    LOG_LEVEL = adsk.core.LogLevels.InfoLogLevel
+    LOG_RATE_LIMIT = 0
+    LOG_FLUSH_INTERVAL = 0.5
+    LOG_EVENT_ID = 'fusion360utils_log_flush'
+
+# Messages logged but not written yet as (message, args, level, force_console)
+_records = collections.deque()
+# Formatted messages waiting to be written to the Fusion log on the main thread as (message, level, log_type)
+_app_records = collections.deque()
+
+# Number of times each message was logged in the current second by (message, args), to rate limit repeated messages
+_rate_window = 0
+_rate_counts = {}
+
+# Writes the queued messages in the background once start_logging has been called
+_flush_thread = None
+_flush_stop = threading.Event()
+_flush_event = None
+_flush_handler = None
+
 
-def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False):
+def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False,
+        args: tuple = ()):
     """Utility function to easily handle logging in your app.
 
+    Messages are queued and written in the background, see start_logging. Messages below the
+    LOG_LEVEL in config are dropped straight away, pass the values of a message in args to skip
+    formatting them as well. If the same message is logged more than LOG_RATE_LIMIT times in a
+    second with the same args the repeats are dropped and counted, errors are always written.
+
     Arguments:
-    message -- The message to log.
+    message -- The message to log, formatted with the % operator if args are given.
     level -- The logging severity level.
-    force_console -- Forces the message to be written to the Text Command window. 
-    """    
-    # Always print to console, only seen through IDE.
-    print(message)  
-
-    # Log all errors to Fusion log file.
-    if level == adsk.core.LogLevels.ErrorLogLevel:
-        log_type = adsk.core.LogTypes.FileLogType
-        app.log(message, level, log_type)
+    force_console -- Forces the message to be written to the Text Command window.
+    args -- Values for the message, only formatted if the message is written.
+    """
+    if level < LOG_LEVEL and not force_console:
+        return
+    if level != adsk.core.LogLevels.ErrorLogLevel and _is_rate_limited(message, args):
+        return
 
-    # If config.DEBUG is True write all log messages to the console.
-    if DEBUG or force_console:
-        log_type = adsk.core.LogTypes.ConsoleLogType
-        app.log(message, level, log_type)
+    _records.append((message, args, level, force_console))
+
+    # Without the background writer messages are written right away
+    if _flush_thread is None:
+        flush_log()
 
 
 def handle_error(name: str, show_message_box: bool = False):
@@ -42,12 +81,138 @@ def handle_error(name: str, show_message_box: bool = False):
     name -- A name used to label the error.
     show_message_box -- Indicates if the error should be shown in the message box.
                         If False, it will only be shown in the Text Command window
-                        and logged to the log file.                        
-    """    
+                        and logged to the log file.
+    """
 
     log('===== Error =====', adsk.core.LogLevels.ErrorLogLevel)
     log(f'{name}\n{traceback.format_exc()}', adsk.core.LogLevels.ErrorLogLevel)
 
+    # Errors are written straight away so they are not lost if Fusion stops
+    flush_log()
+
     # If desired you could show an error as a message box.
     if show_message_box:
-        ui.messageBox(f'{name}\n{traceback.format_exc()}')
\ No newline at end of file
+        ui.messageBox(f'{name}\n{traceback.format_exc()}')
+
+
+def start_logging():
+    """Writes the queued log messages every LOG_FLUSH_INTERVAL seconds instead of on every call to log.
+
+    Messages are formatted and printed on a background thread. The Fusion log can only be written
+    from the main thread, so a custom event is fired to write the messages meant for it.
+    """
+    global _flush_thread, _flush_event, _flush_handler
+    if _flush_thread is not None:
+        return
+
+    from .event_utils import add_handler
+    app.unregisterCustomEvent(LOG_EVENT_ID)
+    _flush_event = app.registerCustomEvent(LOG_EVENT_ID)
+    _flush_handler = add_handler(_flush_event, _handle_flush_event, name='Log Flush Event', local_handlers=[])
+
+    _flush_stop.clear()
+    _flush_thread = threading.Thread(target=_flush_loop, name='fusion360utils log', daemon=True)
+    _flush_thread.start()
+
+
+def stop_logging():
+    """Stops the background writer and writes the remaining messages."""
+    global _flush_thread, _flush_event, _flush_handler
+    if _flush_thread is None:
+        return
+
+    _flush_stop.set()
+    _flush_thread.join()
+    _flush_thread = None
+    flush_log()
+
+    _flush_event.remove(_flush_handler)
+    app.unregisterCustomEvent(LOG_EVENT_ID)
+    _flush_event = None
+    _flush_handler = None
+
+
+def flush_log():
+    """Writes all queued log messages now, must be called on the main thread."""
+    _format_records()
+    _write_app_records()
+
+
+def _handle_flush_event(args: adsk.core.CustomEventArgs):
+    _write_app_records()
+
+
+def _flush_loop():
+    while not _flush_stop.wait(LOG_FLUSH_INTERVAL):
+        _format_records()
+        if _app_records:
+            app.fireCustomEvent(LOG_EVENT_ID, '')
+
+
+def _is_rate_limited(message: str, args: tuple) -> bool:
+    global _rate_window
+    if not LOG_RATE_LIMIT:
+        return False
+
+    window = int(time.monotonic())
+    if window != _rate_window:
+        _report_suppressed()
+        _rate_window = window
+
+    # Messages with different args are different messages, only the same message and args is a repeat
+    key = (message, args)
+    try:
+        count = _rate_counts.get(key, 0) + 1
+    except TypeError:
+        # Args that can't be hashed are never counted
+        return False
+    _rate_counts[key] = count
+    return count > LOG_RATE_LIMIT
+
+
+def _report_suppressed():
+    # Only the messages of the last second are counted, so memory doesn't grow with the number of messages
+    counts = _rate_counts.copy()
+    _rate_counts.clear()
+    for (message, args), count in counts.items():
+        if count > LOG_RATE_LIMIT:
+            _records.append((f'{count - LOG_RATE_LIMIT} more times in one second: {_format(message, args)}', (),
+                             adsk.core.LogLevels.WarningLogLevel, False))
+
+
+def _format(message: str, args: tuple) -> str:
+    if not args:
+        return message
+    try:
+        return message % args
+    except (TypeError, ValueError):
+        return f'{message} {args}'
+
+
+def _format_records():
+    while _records:
+        try:
+            message, args, level, force_console = _records.popleft()
+        except IndexError:
+            break
+        message = _format(message, args)
+
+        # Always print to console, only seen through IDE.
+        print(message)
+
+        # Log all errors to Fusion log file.
+        if level == adsk.core.LogLevels.ErrorLogLevel:
+            _app_records.append((message, level, adsk.core.LogTypes.FileLogType))
+
+        # If config.DEBUG is True write all log messages to the console.
+        if DEBUG or force_console:
+            _app_records.append((message, level, adsk.core.LogTypes.ConsoleLogType))
+
+
+def _write_app_records():
+    while _app_records:
+        try:
+            message, level, log_type = _app_records.popleft()
+        except IndexError:
+            break
+        app.log(message, level, log_type)
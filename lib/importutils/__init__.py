@@ -0,0 +1,16 @@
+from .scheduler import *
+from .api_counter import *
+from .journal import *
+from .job_store import *
+from .manifest import *
+from .memory import *
+from .folders import *
+from .formats import *
+from .step_header import *
+from .stats import *
+from .timing import *
+from .timer import *
+from .sinks import *
+from .shards import *
+from .compaction import *
+from .watch import *
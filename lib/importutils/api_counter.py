@@ -0,0 +1,38 @@
+class ApiCallCounter:
+    """Counts calls into the Fusion 360 API.
+
+    Every attribute read, property access or method lookup on an object returned by wrap is one
+    round trip into Fusion and is counted. Calls made some other way can be added with add.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def wrap(self, api_object):
+        """Returns a proxy for api_object that counts every attribute access."""
+        return _CountingProxy(api_object, self)
+
+    def add(self, calls: int = 1):
+        self.count += calls
+
+    def reset(self) -> int:
+        """Returns the current count and starts again from zero."""
+        count = self.count
+        self.count = 0
+        return count
+
+
+class _CountingProxy:
+    __slots__ = ('_api_object', '_counter')
+
+    def __init__(self, api_object, counter: ApiCallCounter):
+        object.__setattr__(self, '_api_object', api_object)
+        object.__setattr__(self, '_counter', counter)
+
+    def __getattr__(self, name):
+        self._counter.count += 1
+        return getattr(self._api_object, name)
+
+    def __setattr__(self, name, value):
+        self._counter.count += 1
+        setattr(self._api_object, name, value)
@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import json
+import operator
+import os
+import tempfile
+import time
+
+from .sinks import open_sink, read_results, sink_kind
+
+
+def result_identity(row: dict):
+    """Returns what identifies the file of a result row when results are merged.
+
+    Rows are for the same file if they have the same source path. Outputs without the Path column
+    use the URN together with the name. Returns None for a row with neither, such as a failed file
+    in an output without paths, it is never taken for the same file as another row.
+    """
+    path = row.get('Path')
+    if path:
+        return ['path', path.replace('\\', '/')]
+    if row.get('URN'):
+        return ['urn', row['URN'], row.get('Name') or '']
+    return None
+
+
+def is_newer_result(previous: dict, row: dict) -> bool:
+    """Returns True if row replaces previous, a row without a share link never replaces one with a link."""
+    return previous is None or bool(row.get('Link')) or not previous.get('Link')
+
+
+def compact_results(paths, output_path: str, max_rows: int = 100000, fan_in: int = 64, temp_folder: str = None) -> dict:
+    """Merges any number of result files into one file with the newest row of every source file.
+
+    Files are read in order, rows of later files are newer. Memory is bounded by an external sort:
+    up to max_rows rows are sorted by source file and written to a temporary run file, then the runs
+    are merged fan_in at a time. The output is sorted by source path and its type is chosen from
+    its extension. Returns the number of rows read and written, the number of runs and the seconds taken.
+
+    Arguments:
+    paths -- csv, jsonl or SQLite result files or journals, oldest first.
+    output_path -- The compacted file, .csv, .jsonl or .db.
+    max_rows -- Number of rows sorted in memory at a time.
+    fan_in -- Number of run files merged at once.
+    temp_folder -- Folder for the run files, the system temporary folder by default.
+    """
+    started = time.monotonic()
+    kind = sink_kind(output_path)
+    with tempfile.TemporaryDirectory(prefix='compact_', dir=temp_folder) as run_folder:
+        fieldnames, runs, rows_read = _write_runs(paths, run_folder, max(1, max_rows))
+        run_count = len(runs)
+        runs = _merge_runs(runs, run_folder, max(2, fan_in))
+
+        sink = open_sink(kind, output_path, fieldnames, batch_size=1000)
+        try:
+            for row in _newest_rows(_read_runs(runs)):
+                sink.write(row)
+        finally:
+            sink.close()
+
+    return {
+        'rows_read': rows_read,
+        'rows_written': sink.rows_written,
+        'runs': run_count,
+        'seconds': time.monotonic() - started,
+    }
+
+
+# Records are sorted by the identity of their file and then by the order they were read in
+_record_order = operator.itemgetter(0, 1)
+
+
+def _write_runs(paths, run_folder: str, max_rows: int) -> tuple:
+    # Sorted runs of (identity, sequence, row), the sequence keeps the rows of a file in the order they were read.
+    # A row that can't be identified gets an identity of its own.
+    fieldnames = []
+    known_names = set()
+    runs = []
+    sequence = itertools.count()
+    chunk = []
+    for path in paths:
+        for row in read_results(path):
+            if not known_names.issuperset(row):
+                fieldnames.extend(name for name in row if name not in known_names)
+                known_names.update(row)
+            number = next(sequence)
+            chunk.append((result_identity(row) or ['row', number], number, row))
+            if len(chunk) >= max_rows:
+                runs.append(_write_run(chunk, run_folder, len(runs)))
+                chunk = []
+    if chunk or not runs:
+        runs.append(_write_run(chunk, run_folder, len(runs)))
+    return fieldnames, runs, next(sequence)
+
+
+def _write_run(records: list, run_folder: str, number: int) -> str:
+    records.sort(key=_record_order)
+    path = os.path.join(run_folder, f'run_{number:06d}.jsonl')
+    with open(path, mode='w', encoding='utf-8') as run_file:
+        run_file.writelines(json.dumps(record) + '\n' for record in records)
+    return path
+
+
+def _merge_runs(runs: list, run_folder: str, fan_in: int) -> list:
+    # Merge groups of runs until they can all be opened at once
+    number = len(runs)
+    while len(runs) > fan_in:
+        merged = []
+        for start in range(0, len(runs), fan_in):
+            group = runs[start:start + fan_in]
+            path = os.path.join(run_folder, f'run_{number:06d}.jsonl')
+            number += 1
+            with open(path, mode='w', encoding='utf-8') as run_file:
+                run_file.writelines(json.dumps(record) + '\n' for record in _read_runs(group))
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+    return runs
+
+
+def _read_runs(runs: list):
+    files = [open(run, encoding='utf-8') for run in runs]
+    try:
+        yield from heapq.merge(*((json.loads(line) for line in run_file) for run_file in files),
+                               key=_record_order)
+    finally:
+        for run_file in files:
+            run_file.close()
+
+
+def _newest_rows(records):
+    for _, group in itertools.groupby(records, key=lambda record: record[0]):
+        newest = None
+        for _, _, row in group:
+            if is_newer_result(newest, row):
+                newest = row
+        yield newest
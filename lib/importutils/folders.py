@@ -0,0 +1,103 @@
+import os
+
+
+def walk_files(root: str, extensions, recursive: bool = True):
+    """Yields (relative_folder, entry) for every file below root with one of the given extensions.
+
+    Folders are read one at a time with os.scandir while the generator is consumed, so the first
+    files are available long before a large tree has been walked. relative_folder is the path of
+    the file's folder relative to root using '/' separators, '' for files directly in root.
+    Folders that can't be read are skipped.
+
+    Arguments:
+    root -- The folder to walk.
+    extensions -- The file extensions to return, including the dot. Case is ignored.
+    recursive -- If False only the files directly in root are returned.
+    """
+    extensions = {extension.lower() for extension in extensions}
+    pending = [('', root)]
+    while pending:
+        relative_folder, folder_path = pending.pop()
+        sub_folders = []
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                sub_folders.append(entry)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                            yield relative_folder, entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+        # Pushed in reverse so sub folders are walked in the order they were listed
+        for entry in reversed(sub_folders):
+            pending.append((f'{relative_folder}/{entry.name}' if relative_folder else entry.name, entry.path))
+
+
+class DataFolderCache:
+    """Cloud folders below a root DataFolder by their relative path, with the names of their files.
+
+    Each folder is looked up, or created if it doesn't exist, the first time it is needed and the
+    DataFolder is reused after that, so every cloud folder is resolved once per run. The data files
+    of a folder are also read only once, into an index of name to data file id that is kept up to
+    date with add_name as files are saved.
+
+    Arguments:
+    root_folder -- The DataFolder that relative paths start from.
+    """
+
+    def __init__(self, root_folder=None):
+        self._folders = {}
+        self._names = {}
+        self.reset(root_folder)
+
+    def reset(self, root_folder):
+        """Forgets all cached folders and starts from a new root folder."""
+        self._folders = {'': root_folder}
+        self._names = {}
+
+    def get(self, relative_folder: str):
+        """Returns the DataFolder for a relative path with '/' separators, creating missing folders."""
+        folder = self._folders.get(relative_folder)
+        if folder is None:
+            parent_path, _, name = relative_folder.rpartition('/')
+            parent = self.get(parent_path)
+            folder = parent.dataFolders.itemByName(name)
+            if folder is None:
+                folder = parent.dataFolders.add(name)
+                # A new folder has no files, there is nothing to read
+                self._names[relative_folder] = {}
+            self._folders[relative_folder] = folder
+        return folder
+
+    def names(self, relative_folder: str) -> dict:
+        """Returns the id of every data file in a folder by its name, the folder is only read the first time."""
+        names = self._names.get(relative_folder)
+        if names is None:
+            data_files = self.get(relative_folder).dataFiles
+            names = {}
+            for index in range(data_files.count):
+                data_file = data_files.item(index)
+                names.setdefault(data_file.name, data_file.id)
+            self._names[relative_folder] = names
+        return names
+
+    def add_name(self, relative_folder: str, name: str, file_id: str = None):
+        """Records a file saved in a folder, file_id can be None if it isn't known."""
+        names = self.names(relative_folder)
+        if names.get(name) is None:
+            names[name] = file_id
+
+    def unique_name(self, relative_folder: str, name: str) -> str:
+        """Returns name, or name (2), name (3), ... if a file with that name is already in the folder."""
+        names = self.names(relative_folder)
+        if name not in names:
+            return name
+        number = 2
+        while f'{name} ({number})' in names:
+            number += 1
+        return f'{name} ({number})'
@@ -0,0 +1,47 @@
+import os
+
+# Formats that can be imported by name, with their file extensions in lower case and a function that
+# creates the import options for a file from the ImportManager and the path of the file.
+IMPORT_FORMATS = {
+    'step': {
+        'extensions': ('.step', '.stp'),
+        'options': lambda import_manager, path: import_manager.createSTEPImportOptions(path),
+    },
+    'iges': {
+        'extensions': ('.iges', '.igs'),
+        'options': lambda import_manager, path: import_manager.createIGESImportOptions(path),
+    },
+    'sat': {
+        'extensions': ('.sat',),
+        'options': lambda import_manager, path: import_manager.createSATImportOptions(path),
+    },
+    'smt': {
+        'extensions': ('.smt',),
+        'options': lambda import_manager, path: import_manager.createSMTImportOptions(path),
+    },
+    'f3d': {
+        'extensions': ('.f3d',),
+        'options': lambda import_manager, path: import_manager.createFusionArchiveImportOptions(path),
+    },
+}
+
+
+def format_extensions(formats) -> dict:
+    """Returns the name of the format for every extension of the given formats, keys of IMPORT_FORMATS."""
+    extensions = {}
+    for name in formats:
+        if name not in IMPORT_FORMATS:
+            raise ValueError(f'Unknown import format: {name}, expected one of {", ".join(IMPORT_FORMATS)}')
+        for extension in IMPORT_FORMATS[name]['extensions']:
+            extensions[extension] = name
+    return extensions
+
+
+def format_of(path: str, formats=IMPORT_FORMATS):
+    """Returns the name of the format of a file by its extension, ignoring case, None if it is not one of formats."""
+    return format_extensions(formats).get(os.path.splitext(path)[1].lower())
+
+
+def create_import_options(import_manager, format_name: str, path: str):
+    """Returns the import options for a file of the given format."""
+    return IMPORT_FORMATS[format_name]['options'](import_manager, path)
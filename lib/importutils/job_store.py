@@ -0,0 +1,217 @@
+import math
+import sqlite3
+import time
+
+# Columns of the jobs table, named like the keys of a job dict
+JOB_COLUMNS = (
+    'key', 'file_name', 'file_path', 'folder', 'size', 'hash', 'state', 'file_id', 'urn', 'link', 'error',
+    'attempts', 'retry_at', 'time_to_link', 'created', 'updated',
+)
+
+# States of a file that is done, the other states are 'queued', 'waiting' (for the result of a file
+# with the same content), 'dispatched', 'imported' and 'saved'
+FINISHED_STATES = ('linked', 'cached', 'existing', 'duplicate', 'rejected', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    file_name TEXT,
+    file_path TEXT,
+    folder TEXT,
+    size INTEGER,
+    hash TEXT,
+    state TEXT NOT NULL,
+    file_id TEXT,
+    urn TEXT,
+    link TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL,
+    time_to_link REAL,
+    created REAL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS jobs_file_name ON jobs (file_name);
+CREATE INDEX IF NOT EXISTS jobs_file_id ON jobs (file_id);
+CREATE INDEX IF NOT EXISTS jobs_hash ON jobs (hash);
+CREATE TABLE IF NOT EXISTS shared_versions (
+    version_id TEXT PRIMARY KEY,
+    link TEXT,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL,
+    finished REAL
+);
+"""
+
+
+class JobStore:
+    """SQLite table with one row per file of a run and the state the file is in.
+
+    The state of a run is kept on disk instead of in memory, so it survives a crash of Fusion, can
+    be queried and doesn't grow with the number of files. Every change is committed right away,
+    the database uses a write ahead log so that is cheap enough to do for every step of a file.
+
+    The version ids that have a share link are kept in a separate table that is never reset, so
+    versions shared by earlier runs can be skipped without asking Fusion for their link.
+
+    Arguments:
+    path -- Full path of the database file.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._connection = None
+        self._run_id = None
+        self._run_finished = True
+
+    @property
+    def is_open(self) -> bool:
+        return self._connection is not None
+
+    def open(self, path: str = None):
+        """Opens the database, the rows of the previous run are kept."""
+        self.close()
+        self.path = path or self.path
+        self._connection = sqlite3.connect(self.path, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+        run = self._connection.execute('SELECT id, finished FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+        self._run_id = run['id'] if run else None
+        self._run_finished = run is None or run['finished'] is not None
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def reset(self, keep_finished: bool = False):
+        """Deletes the jobs of previous runs, keep_finished only deletes the files that are not done."""
+        if keep_finished:
+            placeholders = ', '.join('?' for _ in FINISHED_STATES)
+            self._connection.execute(f'DELETE FROM jobs WHERE state NOT IN ({placeholders})', FINISHED_STATES)
+        else:
+            self._connection.execute('DELETE FROM jobs')
+
+    def start_run(self):
+        self._run_id = self._connection.execute('INSERT INTO runs (started) VALUES (?)', (time.time(),)).lastrowid
+        self._run_finished = False
+
+    def finish_run(self):
+        self._connection.execute('UPDATE runs SET finished = ? WHERE id = ?', (time.time(), self._run_id))
+        self._run_finished = True
+
+    @property
+    def run_finished(self) -> bool:
+        """True if the last run has finished, or there has been no run."""
+        return self._run_finished
+
+    def add(self, job: dict, state: str, **fields):
+        """Inserts or replaces the row of a job, fields override the values taken from the job."""
+        now = time.time()
+        values = {column: job.get(column) for column in JOB_COLUMNS}
+        values.update(fields)
+        values['state'] = state
+        values['attempts'] = values['attempts'] or 0
+        values['created'] = now
+        values['updated'] = now
+        columns = ', '.join(JOB_COLUMNS)
+        placeholders = ', '.join('?' for _ in JOB_COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in JOB_COLUMNS
+                            if column not in ('key', 'created'))
+        self._connection.execute(
+            f'INSERT INTO jobs ({columns}) VALUES ({placeholders}) ON CONFLICT (key) DO UPDATE SET {updates}',
+            [values[column] for column in JOB_COLUMNS])
+
+    def update(self, key: str, **fields):
+        """Changes the given columns of a job, typically its state."""
+        fields['updated'] = time.time()
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        self._connection.execute(f'UPDATE jobs SET {assignments} WHERE key = ?', [*fields.values(), key])
+
+    def get(self, key: str):
+        """Returns the job with the given key as a dict, None if there is none."""
+        return self._one('SELECT * FROM jobs WHERE key = ?', (key,))
+
+    def find(self, file_id: str = None, file_name: str = None, states: tuple = ('imported', 'saved')):
+        """Returns a job in one of the states by the id of its data file, None if there is none.
+
+        Jobs whose data file id isn't known are matched by name instead. Jobs with an id are never
+        matched by name, so another design with the same name is not taken for one of our files.
+        """
+        placeholders = ', '.join('?' for _ in states)
+        if file_id:
+            job = self._one(f'SELECT * FROM jobs WHERE file_id = ? AND state IN ({placeholders}) LIMIT 1',
+                            (file_id, *states))
+            if job is not None:
+                return job
+        if file_name:
+            return self._one(f'SELECT * FROM jobs WHERE file_name = ? AND file_id IS NULL '
+                             f'AND state IN ({placeholders}) ORDER BY created LIMIT 1', (file_name, *states))
+        return None
+
+    def find_by_file_id(self, file_id: str):
+        """Returns the job of a data file in any state, None if it isn't one of the files of the run."""
+        return self._one('SELECT * FROM jobs WHERE file_id = ? LIMIT 1', (file_id,))
+
+    def find_by_hash(self, content_hash: str):
+        """Returns the first job with this content that is not itself waiting for or using its result."""
+        return self._one("SELECT * FROM jobs WHERE hash = ? AND state NOT IN ('waiting', 'duplicate') "
+                         "ORDER BY created LIMIT 1", (content_hash,))
+
+    def jobs(self, state: str, content_hash: str = None, due_before: float = None) -> list:
+        """Returns the jobs in a state, optionally only those with the given content or retry_at before a time."""
+        query = 'SELECT * FROM jobs WHERE state = ?'
+        parameters = [state]
+        if content_hash is not None:
+            query += ' AND hash = ?'
+            parameters.append(content_hash)
+        if due_before is not None:
+            query += ' AND retry_at <= ?'
+            parameters.append(due_before)
+        return [dict(row) for row in self._connection.execute(query + ' ORDER BY created', parameters)]
+
+    def has_link(self, key: str) -> bool:
+        """True if the file with the given key has a share link."""
+        row = self._connection.execute("SELECT 1 FROM jobs WHERE key = ? AND link IS NOT NULL AND link != ''",
+                                       (key,)).fetchone()
+        return row is not None
+
+    def add_shared(self, version_id: str, link: str):
+        """Remembers that a version has a share link."""
+        self._connection.execute('INSERT OR IGNORE INTO shared_versions (version_id, link, created) VALUES (?, ?, ?)',
+                                 (version_id, link, time.time()))
+
+    def is_shared(self, version_id: str) -> bool:
+        """True if a share link has been created for the version."""
+        row = self._connection.execute('SELECT 1 FROM shared_versions WHERE version_id = ?', (version_id,)).fetchone()
+        return row is not None
+
+    def counts(self) -> dict:
+        """Returns the number of jobs in each state."""
+        return {row['state']: row['count'] for row in
+                self._connection.execute('SELECT state, COUNT(*) AS count FROM jobs GROUP BY state')}
+
+    def link_time_summary(self, pct: float = 95) -> tuple:
+        """Returns the number, mean and pct percentile of the seconds from the start of the run until a link."""
+        row = self._connection.execute(
+            'SELECT COUNT(time_to_link) AS count, AVG(time_to_link) AS mean FROM jobs').fetchone()
+        count = row['count']
+        if not count:
+            return 0, 0.0, 0.0
+        # Nearest rank, like stats.percentile
+        rank = max(1, math.ceil(pct / 100 * count))
+        value = self._connection.execute(
+            'SELECT time_to_link FROM jobs WHERE time_to_link IS NOT NULL ORDER BY time_to_link LIMIT 1 OFFSET ?',
+            (min(rank, count) - 1,)).fetchone()[0]
+        return count, row['mean'], value
+
+    def _one(self, query: str, parameters: tuple):
+        row = self._connection.execute(query, parameters).fetchone()
+        return dict(row) if row is not None else None
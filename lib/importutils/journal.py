@@ -0,0 +1,58 @@
+import json
+import os
+
+
+class ResultsJournal:
+    """Append only JSON lines file with one record per finished file.
+
+    Every record is flushed and fsync'd as soon as it is written so the results of a run survive
+    a crash of Fusion. Use read_journal to load the records again.
+
+    Arguments:
+    path -- Full path of the journal file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def open(self, truncate: bool = False):
+        """Opens the journal for appending, truncate starts a new empty journal."""
+        self.close()
+        self._file = open(self.path, mode='w' if truncate else 'a', encoding='utf-8')
+
+    def append(self, record: dict):
+        """Writes a record and forces it to disk before returning."""
+        if self._file is None:
+            self.open()
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_journal(path: str):
+    """Yields the records of a journal file.
+
+    A missing file yields nothing. A line that can't be decoded, typically the last one of a
+    journal that was being written during a crash, is skipped.
+    """
+    if not os.path.isfile(path):
+        return
+    with open(path, mode='r', encoding='utf-8') as journal_file:
+        for line in journal_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+
+# Files are hashed in blocks of this size so large files are never read into memory at once
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file, reading it in fixed size blocks."""
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_BLOCK_SIZE)
+    view = memoryview(buffer)
+    with open(path, mode='rb', buffering=0) as source_file:
+        while True:
+            size = source_file.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def _manifest_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ImportManifest:
+    """Persistent record of the files imported by previous runs.
+
+    Each source file is stored with its size, modification time and content hash along with the
+    name, URN and share link of the data file it was uploaded to. A file whose size and
+    modification time are unchanged is a hit without reading it. If only the modification time
+    changed the content hash decides.
+
+    The file is read by load, or by the first lookup or record if load wasn't called, so entries
+    recorded outside a run are added to the manifest on disk instead of replacing it.
+
+    Arguments:
+    path -- Full path of the JSON file the manifest is stored in.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = {}
+        self._modified = False
+        self._loaded = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """Reads the manifest from disk, a missing or unreadable file gives an empty manifest."""
+        self._entries = {}
+        self._modified = False
+        self._loaded = True
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, mode='r', encoding='utf-8') as manifest_file:
+                    self._entries = json.load(manifest_file)
+            except ValueError:
+                self._entries = {}
+
+    def save(self):
+        """Writes the manifest if anything changed. The file is replaced atomically."""
+        if not self._modified:
+            return
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, mode='w', encoding='utf-8') as manifest_file:
+            json.dump(self._entries, manifest_file)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(temp_path, self.path)
+        self._modified = False
+
+    def lookup(self, path: str):
+        """Returns the entry for an unchanged file or None if the file is new or changed."""
+        if not self._loaded:
+            self.load()
+        entry = self._entries.get(_manifest_key(path))
+        if entry is None:
+            return None
+
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime_ns == entry['mtime']:
+            return entry
+
+        # The file was touched, it is only unchanged if the content is the same
+        if file_hash(path) != entry['hash']:
+            return None
+        entry['mtime'] = stat.st_mtime_ns
+        self._modified = True
+        return entry
+
+    def record(self, path: str, name: str, urn: str, link: str, content_hash: str = None):
+        """Stores the result of importing a file, the file is hashed if content_hash is not given."""
+        if not self._loaded:
+            self.load()
+        stat = os.stat(path)
+        self._entries[_manifest_key(path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': content_hash or file_hash(path),
+            'name': name,
+            'urn': urn,
+            'link': link,
+        }
+        self._modified = True
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+
+
+def process_rss_mb():
+    """Returns the resident memory of this process (Fusion) in MB, None if it can't be read.
+
+    psutil is used if it is installed, otherwise /proc on Linux and GetProcessMemoryInfo on Windows.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    if os.path.isfile('/proc/self/statm'):
+        try:
+            with open('/proc/self/statm') as statm:
+                pages = int(statm.read().split()[1])
+            return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    if sys.platform == 'win32':
+        return _windows_rss_mb()
+
+    return None
+
+
+def _windows_rss_mb():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+        get_current_process.restype = wintypes.HANDLE
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(get_current_process(), ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize / (1024 * 1024)
+    except (OSError, AttributeError):
+        return None
+
+
+class MemoryGovernor:
+    """Pauses imports while Fusion uses too much memory.
+
+    Imports are paused when the resident memory is above high_mb and resumed once it has dropped
+    below resume_mb, so a run of large files can't make Fusion run out of memory. The number of
+    pauses and the time spent paused are counted.
+
+    Arguments:
+    high_mb -- Memory in MB above which imports are paused, 0 turns the governor off.
+    low_mb -- Memory in MB below which imports are resumed, 0 or a value not below high_mb uses
+              default_low_fraction of high_mb.
+    sample -- Function returning the memory in MB, or None if it isn't known.
+    """
+
+    # Fraction of high_mb imports resume below if low_mb isn't set below high_mb
+    default_low_fraction = 0.8
+
+    def __init__(self, high_mb: float = 0, low_mb: float = 0, sample=process_rss_mb):
+        self.high_mb = high_mb
+        self.low_mb = low_mb
+        self.sample = sample
+        self.reset()
+
+    def reset(self):
+        self.paused = False
+        self.paused_since = None
+        self.last_mb = None
+        self.last_pause = 0.0
+        self.pauses = 0
+        self.paused_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.high_mb > 0
+
+    @property
+    def resume_mb(self) -> float:
+        """Memory in MB below which paused imports are resumed."""
+        if 0 < self.low_mb < self.high_mb:
+            return self.low_mb
+        return self.high_mb * self.default_low_fraction
+
+    def allow_imports(self) -> bool:
+        """Samples the memory and returns True if imports can be started."""
+        if not self.enabled:
+            return True
+
+        self.last_mb = self.sample()
+        if self.last_mb is None:
+            # Nothing is known about the memory, don't hold up the run
+            self.resume()
+        elif not self.paused and self.last_mb > self.high_mb:
+            self.paused = True
+            self.paused_since = time.monotonic()
+            self.pauses += 1
+        elif self.paused and self.last_mb < self.resume_mb:
+            self.resume()
+        return not self.paused
+
+    def resume(self):
+        if self.paused:
+            self.last_pause = time.monotonic() - self.paused_since
+            self.paused_seconds += self.last_pause
+            self.paused = False
+            self.paused_since = None
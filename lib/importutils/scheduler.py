@@ -0,0 +1,166 @@
+from collections import deque
+
+# Orders the import queue can be sorted in, as the sort key and whether to reverse it.
+# 'fifo' keeps the order the folder is read in and is the only one that doesn't read the whole folder first.
+IMPORT_ORDERS = {
+    'fifo': None,
+    'size_ascending': (lambda job: job['size'], False),
+    'size_descending': (lambda job: job['size'], True),
+    'mtime': (lambda job: job['mtime'], False),
+    'name': (lambda job: job['key'].lower(), False),
+}
+
+
+def order_jobs(jobs, order: str = 'fifo'):
+    """Returns the jobs in the given import order, one of the keys of IMPORT_ORDERS.
+
+    'size_ascending' imports the smallest files first (shortest job first) which gives the lowest
+    mean time to link, 'size_descending' starts the largest files first, 'mtime' imports the oldest
+    files first and 'name' sorts by relative path. Sorted orders need 'size' and 'mtime' in each job.
+    """
+    if order not in IMPORT_ORDERS:
+        raise ValueError(f'Unknown import order: {order}, expected one of {", ".join(IMPORT_ORDERS)}')
+    if IMPORT_ORDERS[order] is None:
+        return jobs
+    key, reverse = IMPORT_ORDERS[order]
+    return sorted(jobs, key=key, reverse=reverse)
+
+
+class ImportScheduler:
+    """Queue of files waiting to be imported with a limit on how many documents are open at once.
+
+    A slot is taken when a job is handed out by next_job and is given back with release once the
+    document for that job has been closed (or the import failed). This keeps Fusion from opening
+    every file in a large folder before the first one has been uploaded and closed.
+
+    Each format (the 'format' of a job) can have a lower limit of its own. Jobs are queued per
+    format and next_job hands out the oldest job of a format that has a free slot, so small files
+    keep importing while a format with a tight limit waits.
+
+    Jobs can also come from iterators added with add_source, they are read one after the other.
+    A source is only advanced when a job is needed, and at most lookahead jobs are read ahead while
+    looking for a format with a free slot, so a folder walk can feed imports before it has finished.
+
+    Arguments:
+    max_open -- The maximum number of documents imported but not yet closed.
+    format_limits -- The maximum number of open documents for some formats, by format.
+    lookahead -- The maximum number of queued jobs read from the source.
+    """
+
+    def __init__(self, max_open: int, format_limits: dict = None, lookahead: int = 1000):
+        self.max_open = max(1, max_open)
+        self.format_limits = dict(format_limits or {})
+        self.lookahead = max(1, lookahead)
+        self.open_count = 0
+        self.peak_open = 0
+        self.total_jobs = 0
+        self._queues = {}
+        self._open_formats = {}
+        self._queued_keys = set()
+        self._sources = deque()
+
+    def add(self, job: dict):
+        """Adds a job to the end of the queue of its format."""
+        self._queues.setdefault(job.get('format'), deque()).append((self.total_jobs, job))
+        self._queued_keys.add(job['key'])
+        self.total_jobs += 1
+
+    def extend(self, jobs):
+        """Adds several jobs to the end of the queue."""
+        for job in jobs:
+            self.add(job)
+
+    def add_source(self, jobs):
+        """Adds an iterable of jobs that is consumed lazily after the queued jobs and earlier sources."""
+        self._sources.append(iter(jobs))
+
+    def clear(self):
+        """Drops all queued jobs and resets the counters."""
+        self._queues = {}
+        self._open_formats = {}
+        self._queued_keys = set()
+        self._sources = deque()
+        self.open_count = 0
+        self.peak_open = 0
+        self.total_jobs = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs that have not been handed out yet, not counting an unread source."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def is_exhausted(self) -> bool:
+        """True when the queue is empty and the source has no more jobs."""
+        return not self.queue_depth and not self._read()
+
+    @property
+    def is_idle(self) -> bool:
+        """True when nothing is queued and every slot has been released."""
+        return self.open_count == 0 and self.is_exhausted
+
+    def has_job(self, key: str) -> bool:
+        """True if a job with the given key is queued or holds a slot, not counting unread sources."""
+        return key in self._queued_keys or key in self._open_formats
+
+    def open_for(self, format_name) -> int:
+        """Number of open documents of a format."""
+        return sum(1 for open_format in self._open_formats.values() if open_format == format_name)
+
+    def next_job(self):
+        """Returns the next job and takes a slot for it, or None if no job can be started now."""
+        if self.open_count >= self.max_open:
+            return None
+
+        queue = self._next_queue()
+        while queue is None and self._read():
+            queue = self._next_queue()
+        if queue is None:
+            return None
+
+        _, job = queue.popleft()
+        self._queued_keys.discard(job['key'])
+        self._open_formats[job['key']] = job.get('format')
+        self.open_count += 1
+        self.peak_open = max(self.peak_open, self.open_count)
+        return job
+
+    def release(self, key: str):
+        """Gives back the slot held by the job with the given key whose document was closed."""
+        if key in self._open_formats:
+            del self._open_formats[key]
+            self.open_count -= 1
+
+    def _next_queue(self):
+        # The queue with the oldest job of a format that has a free slot, None if there is none
+        best = None
+        for format_name, queue in self._queues.items():
+            if not queue or (best is not None and queue[0][0] > best[0][0]):
+                continue
+            limit = self.format_limits.get(format_name)
+            if limit is None or self.open_for(format_name) < max(1, limit):
+                best = queue
+        return best
+
+    def _read(self) -> bool:
+        # Reads the next job from the sources into the queue, returns False if there is none or enough are queued
+        if self.queue_depth >= self.lookahead:
+            return False
+        while self._sources:
+            try:
+                self.add(next(self._sources[0]))
+                return True
+            except StopIteration:
+                self._sources.popleft()
+        return False
+
+    def __str__(self):
+        # Lets the status be passed to a log message and only be built if the message is written
+        return self.status()
+
+    def status(self) -> str:
+        source = ', reading folder' if self._sources else ''
+        formats = ''.join(f', {format_name}: {self.open_for(format_name)}/{limit}'
+                          for format_name, limit in self.format_limits.items())
+        return (f'queued: {self.queue_depth}{source}, open: {self.open_count}/{self.max_open}{formats}, '
+                f'peak open: {self.peak_open}, total: {self.total_jobs}')
@@ -0,0 +1,25 @@
+import hashlib
+
+
+def shard_of(key: str, shard_count: int) -> int:
+    """Returns the shard of a file from its path relative to the imported folder.
+
+    The shard only depends on the relative path, with / and \\ treated the same, so every machine
+    puts a file in the same shard wherever the folder is mounted.
+    """
+    digest = hashlib.sha1(key.replace('\\', '/').encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def in_shard(key: str, shard_index: int, shard_count: int) -> bool:
+    """Returns True if the file belongs to shard shard_index of shard_count shards."""
+    if shard_count <= 1:
+        return True
+    return shard_of(key, shard_count) == shard_index
+
+
+def check_shard(shard_index: int, shard_count: int):
+    """Raises ValueError if shard_index is not one of the shard_count shards."""
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f'Shard index {shard_index} is not in 0 to {shard_count - 1}')
+
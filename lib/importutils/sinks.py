@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import sqlite3
+
+
+class ResultSink:
+    """Base class for writers that stream result rows to a file.
+
+    The file is opened once and rows are written in batches of batch_size, so a large run doesn't
+    pay for opening the file or committing for every row. Only the columns in fieldnames are
+    written, other keys of a row are ignored and missing ones are left empty.
+
+    Arguments:
+    path -- Full path of the output file.
+    fieldnames -- The columns to write, in order.
+    batch_size -- Number of rows collected before they are written.
+    append -- Add to an existing file instead of replacing it.
+    """
+
+    def __init__(self, path: str, fieldnames: list, batch_size: int = 100, append: bool = False):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.batch_size = max(1, batch_size)
+        self.append = append
+        self.rows_written = 0
+        self._pending = []
+        self._open()
+
+    def write(self, row: dict):
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the collected rows."""
+        if self._pending:
+            self._write_rows(self._pending)
+            self.rows_written += len(self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_rows(self, rows: list):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvSink(ResultSink):
+    def _open(self):
+        self._file = open(self.path, mode='a' if self.append else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+
+    def _write_rows(self, rows: list):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    def _open(self):
+        self._file = open(self.path, mode='a' if self.append else 'w', encoding='utf-8')
+
+    def _write_rows(self, rows: list):
+        self._file.writelines(
+            json.dumps({name: row.get(name, '') for name in self.fieldnames}) + '\n' for row in rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class SqliteSink(ResultSink):
+    """Writes rows to a 'results' table, one transaction per batch."""
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path)
+        columns = ', '.join(f'"{name}" TEXT' for name in self.fieldnames)
+        placeholders = ', '.join('?' for _ in self.fieldnames)
+        with self._connection:
+            if not self.append:
+                self._connection.execute('DROP TABLE IF EXISTS results')
+            self._connection.execute(f'CREATE TABLE IF NOT EXISTS results ({columns})')
+        self._insert = f'INSERT INTO results VALUES ({placeholders})'
+
+    def _write_rows(self, rows: list):
+        with self._connection:
+            self._connection.executemany(
+                self._insert, ([_sql_value(row.get(name)) for name in self.fieldnames] for row in rows))
+
+    def _close(self):
+        self._connection.close()
+
+
+def _sql_value(value):
+    return '' if value is None else str(value)
+
+
+# Available sinks by the name used in config.RESULT_SINKS
+SINK_TYPES = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'sqlite': SqliteSink,
+}
+
+
+def open_sink(kind: str, path: str, fieldnames: list, batch_size: int = 100, append: bool = False) -> ResultSink:
+    """Opens a result sink of one of the types in SINK_TYPES."""
+    if kind not in SINK_TYPES:
+        raise ValueError(f'Unknown result sink: {kind}, expected one of {", ".join(SINK_TYPES)}')
+    return SINK_TYPES[kind](path, fieldnames, batch_size, append)
+
+
+def sink_kind(path: str) -> str:
+    """Returns the type of result file from its extension, one of the keys of SINK_TYPES."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.json'):
+        return 'jsonl'
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        return 'sqlite'
+    raise ValueError(f'Unknown result file type: {path}, expected .csv, .jsonl or .db')
+
+
+def read_results(path: str):
+    """Yields the rows of a result file written by one of the sinks or the journal, one dict per row."""
+    kind = sink_kind(path)
+    if kind == 'csv':
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            yield from csv.DictReader(csv_file)
+    elif kind == 'jsonl':
+        # The journal has the same format, a line cut off by a crash is skipped
+        with open(path, encoding='utf-8') as jsonl_file:
+            for line in jsonl_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    else:
+        connection = sqlite3.connect(path)
+        try:
+            cursor = connection.execute('SELECT * FROM results')
+            names = [column[0] for column in cursor.description]
+            for values in cursor:
+                yield dict(zip(names, values))
+        finally:
+            connection.close()
@@ -0,0 +1,55 @@
+import math
+import random
+
+
+def percentile(values, pct: float) -> float:
+    """Returns the pct percentile (0 to 100) of values using the nearest rank method, 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Reservoir:
+    """Running count, mean and max of a stream of values with a uniform sample for percentiles.
+
+    At most size values are kept, so the memory used is the same however many values are added.
+    Percentiles are exact until more than size values have been added.
+
+    Arguments:
+    size -- Maximum number of values kept for percentiles.
+    seed -- Seed of the random generator that picks the values to keep.
+    """
+
+    def __init__(self, size: int = 10000, seed: int = 0):
+        self.size = max(1, size)
+        self._random = random.Random(seed)
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._sample = []
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = value if self.count == 1 else max(self.max, value)
+        if len(self._sample) < self.size:
+            self._sample.append(value)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.size:
+                self._sample[index] = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        return percentile(self._sample, pct)
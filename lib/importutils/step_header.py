@@ -0,0 +1,70 @@
+import os
+import re
+
+STEP_SIGNATURE = b'ISO-10303-21;'
+STEP_TERMINATOR = b'END-ISO-10303-21;'
+
+# The header is read in blocks until ENDSEC is found, a header larger than this is rejected
+HEADER_BLOCK_SIZE = 64 * 1024
+MAX_HEADER_SIZE = 1024 * 1024
+
+# Only the end of the file is read to find the terminator
+TAIL_SIZE = 4 * 1024
+
+_COMMENT = re.compile(rb'/\*.*?\*/', re.DOTALL)
+_FILE_SCHEMA = re.compile(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'")
+
+
+def validate_step_file(path: str):
+    """Checks that a file looks like a complete ISO-10303-21 (STEP) file without parsing its data.
+
+    Only the HEADER section and the last few KB of the file are read. The file must start with
+    the ISO-10303-21 signature, have a HEADER section with a FILE_SCHEMA and end with the
+    END-ISO-10303-21 terminator, which catches most truncated uploads and non STEP files.
+
+    Arguments:
+    path -- Full path of the file to check.
+
+    Returns None if the file passes, otherwise the reason it was rejected.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return 'Empty file'
+
+        with open(path, mode='rb') as step_file:
+            header = _read_header(step_file)
+            if not header.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(STEP_SIGNATURE):
+                return 'Missing ISO-10303-21 signature, not a STEP file'
+
+            header = _COMMENT.sub(b'', header)
+            header_start = header.find(b'HEADER;')
+            if header_start < 0:
+                return 'Missing HEADER section'
+            header_end = header.find(b'ENDSEC;', header_start)
+            if header_end < 0:
+                return 'HEADER section is not terminated by ENDSEC'
+            if not _FILE_SCHEMA.search(header, header_start, header_end):
+                return 'Missing FILE_SCHEMA in HEADER section'
+
+            step_file.seek(max(0, size - TAIL_SIZE))
+            if STEP_TERMINATOR not in step_file.read(TAIL_SIZE):
+                return 'Missing END-ISO-10303-21 terminator, the file is truncated'
+
+    except OSError as error:
+        return f'Unable to read file: {error.strerror or error}'
+
+    return None
+
+
+def _read_header(step_file) -> bytes:
+    # Reads blocks until the end of the header section or MAX_HEADER_SIZE
+    header = b''
+    while len(header) < MAX_HEADER_SIZE:
+        block = step_file.read(HEADER_BLOCK_SIZE)
+        if not block:
+            break
+        header += block
+        if b'ENDSEC;' in header:
+            break
+    return header
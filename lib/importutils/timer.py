@@ -0,0 +1,41 @@
+import threading
+
+
+class PeriodicTimer:
+    """Calls a function from a background thread at a fixed interval until stopped.
+
+    The Fusion 360 API may only be used from the main thread, so the function should do nothing
+    more than fire a custom event, for example app.fireCustomEvent(event_id), and the work is done
+    by the handler of that event.
+
+    Arguments:
+    interval -- Seconds between calls.
+    function -- The function to call, it takes no arguments.
+    """
+
+    def __init__(self, interval: float, function):
+        self.interval = interval
+        self.function = function
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the timer, does nothing if it is already running."""
+        if self.is_running:
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the timer, a call that is in progress is finished first."""
+        self._stop_event.set()
+        self._thread = None
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.wait(self.interval):
+            self.function()
@@ -0,0 +1,95 @@
+import json
+import time
+
+from .stats import Reservoir
+
+# Stages of a file in the order they happen and the name of the step that ends at each stage
+STAGES = (
+    ('dispatched', None),
+    ('import_start', 'event_wait'),
+    ('imported', 'import'),
+    ('saved', 'save'),
+    ('complete', 'translation'),
+    ('linked', 'link'),
+    ('closed', 'close'),
+)
+
+
+class LifecycleTrace:
+    """Records when each file reaches every stage of the pipeline.
+
+    mark only stores a time.monotonic() timestamp in a dict, so it is cheap enough to leave on.
+    When a file is finished its timestamps, relative to the first stage, and the duration of each
+    step are written as one JSON line and the durations are added to the summary. Only the files
+    that are in progress are kept in memory.
+
+    Arguments:
+    path -- Full path of the JSON lines trace file, None to only keep the summary.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._file = None
+        self._stamps = {}
+        self._durations = {step: Reservoir() for _, step in STAGES if step}
+        self._durations['total'] = Reservoir()
+
+    def open(self, path: str = None):
+        """Starts a new trace, the previous file and durations are discarded."""
+        self.close()
+        self.path = path or self.path
+        self._stamps = {}
+        for durations in self._durations.values():
+            durations.clear()
+        if self.path:
+            self._file = open(self.path, mode='w', encoding='utf-8')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def mark(self, key: str, stage: str):
+        """Records that the file identified by key reached a stage."""
+        self._stamps.setdefault(key, {})[stage] = time.monotonic()
+
+    def finish(self, key: str, status: str = 'linked'):
+        """Writes the trace of a finished file, nothing happens if the file has no stages."""
+        stamps = self._stamps.pop(key, None)
+        if not stamps:
+            return
+
+        start = min(stamps.values())
+        record = {
+            'key': key,
+            'status': status,
+            'stages': {stage: round(stamp - start, 6) for stage, stamp in stamps.items()},
+            'durations': {},
+        }
+        previous = None
+        for stage, step in STAGES:
+            stamp = stamps.get(stage)
+            if stamp is None:
+                continue
+            if step and previous is not None:
+                duration = stamp - previous
+                record['durations'][step] = round(duration, 6)
+                self._durations[step].add(duration)
+            previous = stamp
+        total = max(stamps.values()) - start
+        record['durations']['total'] = round(total, 6)
+        self._durations['total'].add(total)
+
+        if self._file is not None:
+            self._file.write(json.dumps(record) + '\n')
+
+    def summary(self) -> str:
+        """Returns a table with the count and percentiles in seconds of every step."""
+        lines = [f"{'step':<12} {'count':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"]
+        for step, durations in self._durations.items():
+            if not durations:
+                continue
+            lines.append(f'{step:<12} {durations.count:>7} {durations.mean:>9.3f} '
+                         f'{durations.percentile(50):>9.3f} {durations.percentile(90):>9.3f} '
+                         f'{durations.percentile(99):>9.3f} {durations.max:>9.3f}')
+        return '\n'.join(lines)
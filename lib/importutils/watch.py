@@ -0,0 +1,146 @@
+import os
+import time
+from collections import namedtuple
+
+# A file found by FolderWatcher.scan, mtime in nanoseconds
+WatchedFile = namedtuple('WatchedFile', 'relative_folder name path size mtime')
+
+
+class FolderWatcher:
+    """Finds the new and changed files of a hot folder by rescanning it.
+
+    An index of path to size and modification time is kept for the files that were returned, and
+    scan returns the files that are not in the index or have changed since. A file is only returned
+    once its size and modification time have not changed for settle_seconds, so files that are
+    still being copied into the folder are not imported half written.
+
+    Adding, removing or renaming a file changes the modification time of its folder, so folders
+    whose modification time hasn't changed are not listed again: a rescan of a large tree only
+    stats its folders. Files whose content is rewritten in place don't change their folder, they
+    are found by a full rescan.
+
+    Arguments:
+    root -- The folder to watch.
+    extensions -- The file extensions to return, including the dot. Case is ignored.
+    recursive -- Also watch the sub folders of root.
+    settle_seconds -- Seconds a file must be unchanged before it is returned.
+    clock -- Function returning the time in seconds, for the settle period.
+    """
+
+    # Folders modified less than this many seconds before they were listed are listed again, file
+    # systems with a coarse timestamp can change a folder without changing its modification time
+    mtime_slack = 2.0
+
+    def __init__(self, root: str, extensions, recursive: bool = True, settle_seconds: float = 10.0,
+                 clock=time.monotonic):
+        self.root = root
+        self.extensions = {extension.lower() for extension in extensions}
+        self.recursive = recursive
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+        self.folders_listed = 0
+        # Relative folder -> (modification time, time listed, sub folders as (relative folder, path), files)
+        self._folders = {}
+        # Relative path -> (size, mtime) of the files that were returned
+        self._index = {}
+        # Relative path -> (WatchedFile, time first seen with this size and mtime) of files not returned yet
+        self._settling = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def settling_count(self) -> int:
+        """Number of new or changed files waiting for the settle period."""
+        return len(self._settling)
+
+    def scan(self, full: bool = False) -> list:
+        """Returns the files that are new or changed and have settled, and adds them to the index.
+
+        Arguments:
+        full -- List every folder, also the ones whose modification time hasn't changed.
+        """
+        now = self.clock()
+        self.folders_listed = 0
+        # Folders with files waiting to settle are listed again to see if the files have changed
+        settling_folders = {watched.relative_folder for watched, _ in self._settling.values()}
+        pending = [('', self.root)]
+        while pending:
+            relative_folder, folder_path = pending.pop()
+            list_folder = full or relative_folder in settling_folders
+            sub_folders = self._scan_folder(relative_folder, folder_path, list_folder, now)
+            if self.recursive:
+                pending.extend(reversed(sub_folders))
+        return self._settled(now)
+
+    def _scan_folder(self, relative_folder: str, folder_path: str, list_folder: bool, now: float) -> list:
+        # Returns the sub folders, only listing the folder if it has changed
+        try:
+            mtime = os.stat(folder_path).st_mtime
+        except OSError:
+            self._remove_folder(relative_folder)
+            return []
+
+        cached = self._folders.get(relative_folder)
+        if not list_folder and cached is not None and cached[0] == mtime and cached[1] - mtime > self.mtime_slack:
+            return cached[2]
+
+        self.folders_listed += 1
+        sub_folders = []
+        names = set()
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_folders.append((f'{relative_folder}/{entry.name}' if relative_folder else entry.name,
+                                                entry.path))
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.extensions:
+                            stat = entry.stat()
+                            key = f'{relative_folder}/{entry.name}' if relative_folder else entry.name
+                            names.add(key)
+                            self._check(WatchedFile(relative_folder, entry.name, entry.path, stat.st_size,
+                                                    stat.st_mtime_ns), now)
+                    except OSError:
+                        continue
+        except OSError:
+            self._remove_folder(relative_folder)
+            return []
+
+        # Files and folders that are gone are forgotten, so they are imported again if they come back
+        if cached is not None:
+            for key in cached[3] - names:
+                self._index.pop(key, None)
+                self._settling.pop(key, None)
+            for gone in set(cached[2]) - set(sub_folders):
+                self._remove_folder(gone[0])
+
+        self._folders[relative_folder] = (mtime, time.time(), sub_folders, names)
+        return sub_folders
+
+    def _check(self, watched: WatchedFile, now: float):
+        key = f'{watched.relative_folder}/{watched.name}' if watched.relative_folder else watched.name
+        if self._index.get(key) == (watched.size, watched.mtime):
+            self._settling.pop(key, None)
+            return
+
+        settling = self._settling.get(key)
+        if settling is None or (settling[0].size, settling[0].mtime) != (watched.size, watched.mtime):
+            self._settling[key] = (watched, now)
+
+    def _settled(self, now: float) -> list:
+        settled = []
+        for key, (watched, since) in list(self._settling.items()):
+            if now - since >= self.settle_seconds:
+                del self._settling[key]
+                self._index[key] = (watched.size, watched.mtime)
+                settled.append(watched)
+        return settled
+
+    def _remove_folder(self, relative_folder: str):
+        prefix = f'{relative_folder}/' if relative_folder else ''
+        for folder in [folder for folder in self._folders if folder == relative_folder or folder.startswith(prefix)]:
+            del self._folders[folder]
+        for index in (self._index, self._settling):
+            for key in [key for key in index if key.startswith(prefix)]:
+                del index[key]
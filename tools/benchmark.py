@@ -0,0 +1,245 @@
+# Headless throughput benchmark for the Import And Share add-in.
+#
+# Runs the real add-in modules against the simulated Fusion 360 API in tools/fake_adsk, so it
+# works on any machine with Python and no Fusion 360 install. For each file count a folder of
+# synthetic STEP files is created, Import Folder is clicked and the simulated event loop is run
+# until the run finishes. If dataFileComplete events are dropped, Process Remaining is clicked
+# whenever the event loop goes quiet, like a user would. Results are counted from output.csv, a file
+# only counts if it has exactly one row whose status is the state the run ended with.
+#
+# Usage:
+#   python tools/benchmark.py --files 10 100 1000 10000
+#   python tools/benchmark.py --files 500 --translation-latency 0.2 --max-open 25
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+TOOLS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+ADDIN_FOLDER = os.path.dirname(TOOLS_FOLDER)
+
+sys.path.insert(0, os.path.join(TOOLS_FOLDER, 'fake_adsk'))
+sys.path.insert(0, os.path.dirname(ADDIN_FOLDER))
+
+import adsk.core  # noqa: E402 (the simulated module)
+
+STEP_TEMPLATE = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION((''),'2;1');
+FILE_NAME('{name}','2024-01-01T00:00:00',(''),(''),'','','');
+FILE_SCHEMA(('AUTOMOTIVE_DESIGN {{ 1 0 10303 214 3 1 1 }}'));
+ENDSEC;
+DATA;
+{data}ENDSEC;
+END-ISO-10303-21;
+"""
+
+
+def create_step_files(folder: str, count: int, mean_size_kb: float, seed: int):
+    """Writes count valid STEP files with unique content and log-normally distributed sizes."""
+    rng = random.Random(seed)
+    for index in range(count):
+        name = f'part_{index:05d}'
+        size = int(rng.lognormvariate(0, 1) * mean_size_kb * 1024 / 1.65)
+        line = f"#{index}=CARTESIAN_POINT('{name}',(0.,0.,0.));\n"
+        data = line * max(1, size // len(line))
+        with open(os.path.join(folder, f'{name}.step'), 'w') as step_file:
+            step_file.write(STEP_TEMPLATE.format(name=name, data=data))
+
+
+def check_results(rows: list, states: dict) -> list:
+    """Returns the problems of the output rows of a run compared to the state of its files by source path.
+
+    Every file must have exactly one row and its status must be the state the run ended in. The
+    problems are returned as (path, problem) pairs.
+    """
+    problems = []
+    seen = set()
+    for row in rows:
+        path = row.get('Path')
+        if path in seen:
+            problems.append((path, 'more than one row'))
+        elif path not in states:
+            problems.append((path, 'row for an unknown file'))
+        elif row.get('Status') != states[path]:
+            problems.append((path, f"{row.get('Status')} in the output but {states[path]} in the run state"))
+        seen.add(path)
+    problems.extend((path, 'no row') for path in states if path not in seen)
+    return problems
+
+
+def load_addin(state_folder: str):
+    """Imports the add-in package with the simulated adsk module and starts it with its run state in state_folder."""
+    package = os.path.basename(ADDIN_FOLDER)
+    config = importlib.import_module(f'{package}.config')
+    # The run state is opened when the add-in starts, keep it out of the add-in folder
+    config.state_file_name = os.path.join(state_folder, 'run_state.db')
+    addin = importlib.import_module(f'{package}.ImportAndShare')
+    modules = {
+        'config': config,
+        'import_folder': importlib.import_module(f'{package}.commands.importFolder'),
+        'complete': importlib.import_module(f'{package}.commands.dataFileComplete.entry'),
+        'remaining': importlib.import_module(f'{package}.commands.processRemaining'),
+    }
+    addin.run(None)
+    return addin, modules
+
+
+def run_benchmark(modules: dict, file_count: int, args) -> dict:
+    app = adsk.core.Application.get()
+    app.reset()
+    app.configure(adsk.core.SimulationSettings(
+        import_latency=args.import_latency,
+        import_latency_per_mb=args.import_latency_per_mb,
+        save_latency=args.save_latency,
+        translation_latency=args.translation_latency,
+        link_latency=args.link_latency,
+        close_latency=args.close_latency,
+        jitter=args.jitter,
+        link_failure_rate=args.link_failure_rate,
+        drop_complete_rate=args.drop_complete_rate,
+        document_memory_mb=args.document_memory_mb,
+        seed=args.seed,
+    ))
+
+    config = modules['config']
+    complete = modules['complete']
+    config.MAX_OPEN_DOCUMENTS = args.max_open
+    config.IMPORT_ORDER = args.order
+    config.RESUME_RUN = False
+    config.USE_MANIFEST_CACHE = False
+    config.COMPLETE_TIMEOUT = args.complete_timeout
+    config.RETRY_DELAY = args.retry_delay
+    config.WATCHDOG_INTERVAL = args.watchdog_interval
+    config.PROFILE_HANDLERS = args.profile
+    config.MEMORY_HIGH_WATER_MB = args.high_water_mb
+    config.MEMORY_LOW_WATER_MB = args.low_water_mb
+    # The results are counted from the csv output, by source path
+    config.RESULT_SINKS = ['csv']
+    config.RESULT_COLUMNS = ['Name', 'URN', 'Link', 'Status', 'Error', 'Path']
+    # The memory governor sees the simulated memory of the open documents instead of this process
+    complete.memory_governor.sample = lambda: app.documents.count * app.settings.document_memory_mb
+
+    with tempfile.TemporaryDirectory() as work_folder:
+        source_folder = os.path.join(work_folder, 'source')
+        os.mkdir(source_folder)
+        create_step_files(source_folder, file_count, args.mean_size_kb, args.seed)
+
+        # Keep the output of the benchmark out of the add-in folder
+        config.csv_file_name = os.path.join(work_folder, 'output.csv')
+        config.journal_file_name = os.path.join(work_folder, 'output_journal.jsonl')
+        complete.results_journal.path = config.journal_file_name
+        config.trace_file_name = os.path.join(work_folder, 'output_trace.jsonl')
+        config.state_file_name = os.path.join(work_folder, 'run_state.db')
+        complete.job_store.open(config.state_file_name)
+
+        app.folder_dialog_result = source_folder
+        import_command = app.userInterface.commandDefinitions.itemById(modules['import_folder'].CMD_ID)
+        remaining_command = app.userInterface.commandDefinitions.itemById(modules['remaining'].CMD_ID)
+
+        remaining_clicks = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_command.execute()
+            deadline = time.monotonic() + args.timeout
+            while not complete.job_store.run_finished and time.monotonic() < deadline:
+                app.run_until(lambda: complete.job_store.run_finished or not app.has_pending_events(),
+                              timeout=deadline - time.monotonic())
+                if not complete.job_store.run_finished and not app.has_pending_events():
+                    remaining_command.execute()
+                    remaining_clicks += 1
+            # Write the queued log messages before the output is printed again
+            complete.futil.flush_log()
+        wall_time = time.perf_counter() - start
+
+        # Only the rows that made it to the output count, checked against the state of every file
+        states = {job['file_path']: job['state'] for state in complete.job_store.counts()
+                  for job in complete.job_store.jobs(state)}
+        finished = complete.job_store.run_finished
+        complete.job_store.close()
+        rows = list(complete.importutils.read_results(config.csv_file_name)) if finished else []
+        problems = check_results(rows, states)
+        results = len({row['Path'] for row in rows} - {path for path, _ in problems})
+
+    return {
+        'files': file_count,
+        'finished': finished,
+        'wall_time': wall_time,
+        'throughput': results / wall_time if wall_time else 0.0,
+        'results': results,
+        'failed': sum(1 for row in rows if row['Status'] in ('failed', 'rejected')),
+        'problems': problems,
+        'peak_open': app.stats.peak_open_documents,
+        'custom_events': app.stats.custom_events,
+        'remaining_clicks': remaining_clicks,
+        'memory_pauses': complete.memory_governor.pauses,
+        'memory_paused_seconds': complete.memory_governor.paused_seconds,
+        'timings': complete.lifecycle_trace.summary() if config.TRACE_TIMINGS else '',
+        'profile': complete.futil.profile_summary() if args.profile else '',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless throughput benchmark for Import And Share')
+    parser.add_argument('--files', type=int, nargs='+', default=[10, 100, 1000],
+                        help='number of synthetic files for each run')
+    parser.add_argument('--max-open', type=int, default=10, help='config.MAX_OPEN_DOCUMENTS')
+    parser.add_argument('--order', default='fifo', help='config.IMPORT_ORDER')
+    parser.add_argument('--mean-size-kb', type=float, default=20.0, help='mean size of the synthetic files')
+    parser.add_argument('--import-latency', type=float, default=0.002)
+    parser.add_argument('--import-latency-per-mb', type=float, default=0.01)
+    parser.add_argument('--save-latency', type=float, default=0.001)
+    parser.add_argument('--translation-latency', type=float, default=0.02)
+    parser.add_argument('--link-latency', type=float, default=0.001)
+    parser.add_argument('--close-latency', type=float, default=0.0005)
+    parser.add_argument('--jitter', type=float, default=0.25)
+    parser.add_argument('--drop-complete-rate', type=float, default=0.0,
+                        help='fraction of dataFileComplete events that never fire')
+    parser.add_argument('--link-failure-rate', type=float, default=0.0,
+                        help='fraction of DataFile.publicLink reads that raise')
+    parser.add_argument('--complete-timeout', type=float, default=1.0, help='config.COMPLETE_TIMEOUT')
+    parser.add_argument('--retry-delay', type=float, default=0.1, help='config.RETRY_DELAY')
+    parser.add_argument('--watchdog-interval', type=float, default=0.1, help='config.WATCHDOG_INTERVAL')
+    parser.add_argument('--document-memory-mb', type=float, default=50.0,
+                        help='simulated memory held by each open document')
+    parser.add_argument('--high-water-mb', type=float, default=0, help='config.MEMORY_HIGH_WATER_MB')
+    parser.add_argument('--low-water-mb', type=float, default=0, help='config.MEMORY_LOW_WATER_MB')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timings', action='store_true', help='print the time spent in each stage for every run')
+    parser.add_argument('--profile', action='store_true',
+                        help='print the time spent in each event handler and pipeline step for every run')
+    parser.add_argument('--timeout', type=float, default=600.0, help='seconds before a run is abandoned')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_folder:
+        with contextlib.redirect_stdout(io.StringIO()):
+            addin, modules = load_addin(state_folder)
+
+        print(f"{'files':>8} {'results':>8} {'failed':>7} {'wall s':>9} {'files/s':>9} {'peak open':>10} "
+              f"{'events':>8} {'remaining':>10} {'finished':>9}")
+        for file_count in args.files:
+            report = run_benchmark(modules, file_count, args)
+            print(f"{report['files']:>8} {report['results']:>8} {report['failed']:>7} {report['wall_time']:>9.2f} "
+                  f"{report['throughput']:>9.1f} {report['peak_open']:>10} {report['custom_events']:>8} "
+                  f"{report['remaining_clicks']:>10} {str(report['finished']):>9}")
+            if report['problems']:
+                print(f"output.csv doesn't match the run: {len(report['problems'])} problems, "
+                      f"first ones: {'; '.join(f'{path}: {problem}' for path, problem in report['problems'][:5])}")
+            if args.high_water_mb:
+                print(f"memory pauses: {report['memory_pauses']}, paused {report['memory_paused_seconds']:.2f} s")
+            if args.timings:
+                print(report['timings'])
+            if args.profile:
+                print(report['profile'])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            addin.stop(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+# Headless stand-in for the Fusion 360 ``adsk`` package.
+# Only the parts of the API used by this add-in are modelled.
+from . import core
+from . import fusion
+
+_auto_terminate = True
+_terminated = False
+
+
+def autoTerminate(value: bool):
+    global _auto_terminate
+    _auto_terminate = value
+
+
+def terminate():
+    global _terminated
+    _terminated = True
+
+
+def doEvents():
+    core.Application.get().process_events()
@@ -0,0 +1,698 @@
+# Headless stand-in for the parts of adsk.core used by this add-in.
+#
+# The classes mirror the names and call signatures of the real Fusion 360 API closely enough that
+# the add-in modules can be imported and driven unchanged. Anything the add-in does not touch is
+# left out. Latencies are modelled with SimulationSettings and the main thread event loop is
+# driven explicitly with Application.process_events() or Application.run_until().
+import heapq
+import itertools
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+
+class LogLevels:
+    InfoLogLevel = 0
+    WarningLogLevel = 1
+    ErrorLogLevel = 2
+
+
+class LogTypes:
+    ConsoleLogType = 0
+    FileLogType = 1
+
+
+class MessageBoxButtonTypes:
+    OKButtonType = 0
+    OKCancelButtonType = 1
+    RetryCancelButtonType = 2
+    YesNoButtonType = 3
+    YesNoCancelButtonType = 4
+
+
+class DialogResults:
+    DialogError = -1
+    DialogOK = 0
+    DialogCancel = 1
+    DialogNo = 2
+    DialogYes = 3
+
+
+class SimulationSettings:
+    """Latency and failure model for the simulated Fusion session. All times are in seconds.
+
+    import_latency -- Fixed cost of importToNewDocument, blocks the main thread.
+    import_latency_per_mb -- Additional import cost per MB of source file.
+    save_latency -- Cost of Document.saveAs (upload start), blocks the main thread.
+    translation_latency -- Delay between saveAs and the dataFileComplete event.
+    link_latency -- Cost of reading DataFile.publicLink, blocks the main thread.
+    close_latency -- Cost of Document.close, blocks the main thread.
+    jitter -- Relative random variation applied to every latency (0.1 means +/-10%).
+    link_failure_rate -- Probability that reading DataFile.publicLink raises.
+    drop_complete_rate -- Probability that a dataFileComplete event is never fired.
+    document_memory_mb -- Simulated memory held by each open document.
+    seed -- Seed for the random number generator so runs are repeatable.
+    """
+
+    def __init__(self, import_latency=0.0, import_latency_per_mb=0.0, save_latency=0.0,
+                 translation_latency=0.0, link_latency=0.0, close_latency=0.0, jitter=0.0,
+                 link_failure_rate=0.0, drop_complete_rate=0.0, document_memory_mb=50.0, seed=0):
+        self.import_latency = import_latency
+        self.import_latency_per_mb = import_latency_per_mb
+        self.save_latency = save_latency
+        self.translation_latency = translation_latency
+        self.link_latency = link_latency
+        self.close_latency = close_latency
+        self.jitter = jitter
+        self.link_failure_rate = link_failure_rate
+        self.drop_complete_rate = drop_complete_rate
+        self.document_memory_mb = document_memory_mb
+        self.seed = seed
+
+
+class SimulationStats:
+    """Counters collected by the simulated session."""
+
+    def __init__(self):
+        self.imports = 0
+        self.saves = 0
+        self.links = 0
+        self.closes = 0
+        self.custom_events = 0
+        self.open_documents = 0
+        self.peak_open_documents = 0
+
+
+# ******** Events ********
+
+class EventHandler:
+    def notify(self, args):
+        pass
+
+
+class CustomEventHandler(EventHandler):
+    pass
+
+
+class DataEventHandler(EventHandler):
+    pass
+
+
+class CommandCreatedEventHandler(EventHandler):
+    pass
+
+
+class CommandEventHandler(EventHandler):
+    pass
+
+
+class EventArgs:
+    def __init__(self, firing_event=None):
+        self.firingEvent = firing_event
+
+
+class CustomEventArgs(EventArgs):
+    def __init__(self, firing_event, additional_info):
+        super().__init__(firing_event)
+        self.additionalInfo = additional_info
+
+
+class DataEventArgs(EventArgs):
+    def __init__(self, firing_event, data_file):
+        super().__init__(firing_event)
+        self.file = data_file
+
+
+class CommandCreatedEventArgs(EventArgs):
+    def __init__(self, firing_event, command):
+        super().__init__(firing_event)
+        self.command = command
+
+
+class CommandEventArgs(EventArgs):
+    def __init__(self, firing_event, command):
+        super().__init__(firing_event)
+        self.command = command
+
+
+class Event:
+    def __init__(self, name=''):
+        self.name = name
+        self._handlers = []
+
+    def _add(self, handler):
+        self._handlers.append(handler)
+        return True
+
+    def _remove(self, handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+            return True
+        return False
+
+    def _fire(self, args):
+        for handler in list(self._handlers):
+            handler.notify(args)
+
+
+class CustomEvent(Event):
+    def add(self, handler: 'CustomEventHandler'):
+        return self._add(handler)
+
+    def remove(self, handler: 'CustomEventHandler'):
+        return self._remove(handler)
+
+    @property
+    def eventId(self):
+        return self.name
+
+
+class DataEvent(Event):
+    def add(self, handler: 'DataEventHandler'):
+        return self._add(handler)
+
+    def remove(self, handler: 'DataEventHandler'):
+        return self._remove(handler)
+
+
+class CommandCreatedEvent(Event):
+    def add(self, handler: 'CommandCreatedEventHandler'):
+        return self._add(handler)
+
+    def remove(self, handler: 'CommandCreatedEventHandler'):
+        return self._remove(handler)
+
+
+class CommandEvent(Event):
+    def add(self, handler: 'CommandEventHandler'):
+        return self._add(handler)
+
+    def remove(self, handler: 'CommandEventHandler'):
+        return self._remove(handler)
+
+
+# ******** Data ********
+
+class DataFile:
+    def __init__(self, app, name, parent_folder):
+        self._app = app
+        token = uuid.uuid4().hex
+        self.id = f'urn:adsk.wipprod:dm.lineage:{token}'
+        self.versionId = f'urn:adsk.wipprod:fs.file:vf.{token}?version=1'
+        self.versionNumber = 1
+        self.name = name
+        self.fileExtension = 'f3d'
+        self.parentFolder = parent_folder
+        self.isComplete = False
+        self.isValid = True
+        self._public_link = None
+
+    @property
+    def publicLink(self):
+        self._app._pause(self._app.settings.link_latency)
+        if self._app._random.random() < self._app.settings.link_failure_rate:
+            raise RuntimeError(f'3 : Failed to create public link for {self.name}')
+        if self._public_link is None:
+            self._public_link = f'https://a360.co/{uuid.uuid4().hex[:8]}'
+            self._app.stats.links += 1
+        return self._public_link
+
+    def _complete(self):
+        self.isComplete = True
+        if self._app._random.random() < self._app.settings.drop_complete_rate:
+            return
+        self._app.dataFileComplete._fire(DataEventArgs(self._app.dataFileComplete, self))
+
+
+class DataFiles:
+    def __init__(self):
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    def asArray(self):
+        return list(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DataFolders:
+    def __init__(self, app, parent):
+        self._app = app
+        self._parent = parent
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    def itemByName(self, name):
+        for folder in self._items:
+            if folder.name == name:
+                return folder
+        return None
+
+    def add(self, name):
+        folder = DataFolder(self._app, name, self._parent)
+        self._items.append(folder)
+        return folder
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DataFolder:
+    def __init__(self, app, name, parent_folder=None):
+        self.id = f'urn:adsk.wipprod:fs.folder:co.{uuid.uuid4().hex}'
+        self.name = name
+        self.parentFolder = parent_folder
+        self.isValid = True
+        self.dataFolders = DataFolders(app, self)
+        self.dataFiles = DataFiles()
+
+
+class DataProject:
+    def __init__(self, app, name):
+        self.name = name
+        self.rootFolder = DataFolder(app, name)
+
+
+class Data:
+    def __init__(self, app):
+        self._app = app
+        self.activeProject = DataProject(app, 'Simulated Project')
+        self._files_by_id = {}
+
+    def findFileById(self, file_id):
+        return self._files_by_id.get(file_id)
+
+
+# ******** Documents ********
+
+class Document:
+    def __init__(self, app, name):
+        self._app = app
+        self.name = name
+        self.isValid = True
+        self.isSaved = False
+        self.isModified = True
+        self.dataFile = None
+
+    def saveAs(self, name, dataFolder, description, tag):
+        app = self._app
+        app._pause(app.settings.save_latency)
+        data_file = DataFile(app, name, dataFolder)
+        dataFolder.dataFiles._items.append(data_file)
+        app.data._files_by_id[data_file.id] = data_file
+        self.name = name
+        self.dataFile = data_file
+        self.isSaved = True
+        self.isModified = False
+        app.stats.saves += 1
+        app.schedule(app._latency(app.settings.translation_latency), data_file._complete)
+        return True
+
+    def close(self, saveChanges):
+        if not self.isValid:
+            return False
+        app = self._app
+        app._pause(app.settings.close_latency)
+        self.isValid = False
+        app.documents._items.remove(self)
+        app.stats.closes += 1
+        app.stats.open_documents = len(app.documents._items)
+        return True
+
+    def activate(self):
+        return self.isValid
+
+
+class Documents:
+    def __init__(self):
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ImportOptions:
+    def __init__(self, filename):
+        self.filename = filename
+
+
+class STEPImportOptions(ImportOptions):
+    pass
+
+
+class IGESImportOptions(ImportOptions):
+    pass
+
+
+class SATImportOptions(ImportOptions):
+    pass
+
+
+class SMTImportOptions(ImportOptions):
+    pass
+
+
+class FusionArchiveImportOptions(ImportOptions):
+    pass
+
+
+class ImportManager:
+    def __init__(self, app):
+        self._app = app
+
+    def createSTEPImportOptions(self, filename):
+        return STEPImportOptions(filename)
+
+    def createIGESImportOptions(self, filename):
+        return IGESImportOptions(filename)
+
+    def createSATImportOptions(self, filename):
+        return SATImportOptions(filename)
+
+    def createSMTImportOptions(self, filename):
+        return SMTImportOptions(filename)
+
+    def createFusionArchiveImportOptions(self, filename):
+        return FusionArchiveImportOptions(filename)
+
+    def importToNewDocument(self, importOptions):
+        app = self._app
+        file_path = importOptions.filename
+        if not os.path.isfile(file_path):
+            raise RuntimeError(f'2 : InternalValidationError : file not found {file_path}')
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        app._pause(app.settings.import_latency + app.settings.import_latency_per_mb * size_mb)
+        document = Document(app, os.path.splitext(os.path.basename(file_path))[0])
+        app.documents._items.append(document)
+        app.stats.imports += 1
+        app.stats.open_documents = len(app.documents._items)
+        app.stats.peak_open_documents = max(app.stats.peak_open_documents, app.stats.open_documents)
+        return document
+
+
+# ******** User Interface ********
+
+class Command:
+    def __init__(self, parent_definition):
+        self.parentCommandDefinition = parent_definition
+        self.isAutoExecute = False
+        self.execute = CommandEvent('execute')
+        self.destroy = CommandEvent('destroy')
+
+
+class CommandDefinition:
+    def __init__(self, definitions, definition_id, name, tooltip, resource_folder):
+        self._definitions = definitions
+        self.id = definition_id
+        self.name = name
+        self.tooltip = tooltip
+        self.resourceFolder = resource_folder
+        self.isValid = True
+        self.commandCreated = CommandCreatedEvent('commandCreated')
+
+    def execute(self):
+        """Simulates the user clicking the button for this command."""
+        command = Command(self)
+        self.commandCreated._fire(CommandCreatedEventArgs(self.commandCreated, command))
+        if command.isAutoExecute:
+            command.execute._fire(CommandEventArgs(command.execute, command))
+        command.destroy._fire(CommandEventArgs(command.destroy, command))
+        return True
+
+    def deleteMe(self):
+        self.isValid = False
+        self._definitions._items.pop(self.id, None)
+        return True
+
+
+class CommandDefinitions:
+    def __init__(self):
+        self._items = {}
+
+    def addButtonDefinition(self, definition_id, name, tooltip, resourceFolder=''):
+        if definition_id in self._items:
+            raise RuntimeError(f'3 : A command definition with the id "{definition_id}" already exists')
+        definition = CommandDefinition(self, definition_id, name, tooltip, resourceFolder)
+        self._items[definition_id] = definition
+        return definition
+
+    def itemById(self, definition_id):
+        return self._items.get(definition_id)
+
+    @property
+    def count(self):
+        return len(self._items)
+
+
+class CommandControl:
+    def __init__(self, controls, command_definition):
+        self._controls = controls
+        self.id = command_definition.id
+        self.commandDefinition = command_definition
+        self.isPromoted = False
+
+    def deleteMe(self):
+        self._controls._items.pop(self.id, None)
+        return True
+
+
+class ToolbarControls:
+    def __init__(self):
+        self._items = {}
+
+    def addCommand(self, commandDefinition, positionID='', isBefore=False):
+        control = CommandControl(self, commandDefinition)
+        self._items[commandDefinition.id] = control
+        return control
+
+    def itemById(self, control_id):
+        return self._items.get(control_id)
+
+
+class ToolbarPanel:
+    def __init__(self, panel_id):
+        self.id = panel_id
+        self.controls = ToolbarControls()
+
+
+class ToolbarPanels:
+    def __init__(self):
+        self._items = {}
+
+    def itemById(self, panel_id):
+        return self._items.setdefault(panel_id, ToolbarPanel(panel_id))
+
+
+class Workspace:
+    def __init__(self, workspace_id):
+        self.id = workspace_id
+        self.toolbarPanels = ToolbarPanels()
+
+
+class Workspaces:
+    def __init__(self):
+        self._items = {}
+
+    def itemById(self, workspace_id):
+        return self._items.setdefault(workspace_id, Workspace(workspace_id))
+
+
+class FolderDialog:
+    def __init__(self, app):
+        self._app = app
+        self.title = ''
+        self.folder = ''
+
+    def showDialog(self):
+        if self._app.folder_dialog_result:
+            self.folder = self._app.folder_dialog_result
+            return DialogResults.DialogOK
+        return DialogResults.DialogCancel
+
+
+class UserInterface:
+    def __init__(self, app):
+        self._app = app
+        self.commandDefinitions = CommandDefinitions()
+        self.workspaces = Workspaces()
+        self.messages = []
+
+    def createFolderDialog(self):
+        return FolderDialog(self._app)
+
+    def messageBox(self, text, title='', buttons=0, icon=0):
+        self.messages.append(text)
+        if buttons in (MessageBoxButtonTypes.YesNoButtonType, MessageBoxButtonTypes.YesNoCancelButtonType):
+            return DialogResults.DialogYes
+        return DialogResults.DialogOK
+
+
+# ******** Application ********
+
+class Application:
+    _instance = None
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
+
+    def __init__(self):
+        self.settings = SimulationSettings()
+        self.stats = SimulationStats()
+        self.userInterface = UserInterface(self)
+        self.importManager = ImportManager(self)
+        self.documents = Documents()
+        self.data = Data(self)
+        self.dataFileComplete = DataEvent('dataFileComplete')
+        self.folder_dialog_result = None
+        self.echo_log = False
+        self.log_records = []
+        self._custom_events = {}
+        self._posted = queue.Queue()
+        self._timers = []
+        self._timer_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._random = random.Random(0)
+
+    def configure(self, settings: SimulationSettings):
+        """Replaces the latency model and reseeds the random number generator."""
+        self.settings = settings
+        self._random = random.Random(settings.seed)
+
+    # ******** API surface ********
+
+    def registerCustomEvent(self, eventId):
+        event = CustomEvent(eventId)
+        self._custom_events[eventId] = event
+        return event
+
+    def unregisterCustomEvent(self, eventId):
+        return self._custom_events.pop(eventId, None) is not None
+
+    def fireCustomEvent(self, eventId, additionalInfo=''):
+        # Like Fusion this may be called from any thread, the handler runs later on the main thread.
+        self._posted.put((eventId, additionalInfo))
+        return True
+
+    def log(self, message, level=LogLevels.InfoLogLevel, type=LogTypes.ConsoleLogType):
+        self.log_records.append((level, type, message))
+        if self.echo_log:
+            print(message)
+
+    # ******** Simulation loop ********
+
+    def schedule(self, delay, callback):
+        """Runs callback on the main thread after delay seconds."""
+        with self._timer_lock:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._sequence), callback))
+
+    def process_events(self):
+        """Runs every custom event and timer that is due now. Returns the number of callbacks run."""
+        processed = 0
+        while True:
+            callback = self._next_due_timer()
+            if callback is not None:
+                callback()
+                processed += 1
+                continue
+            try:
+                event_id, additional_info = self._posted.get_nowait()
+            except queue.Empty:
+                return processed
+            self._dispatch(event_id, additional_info)
+            processed += 1
+
+    def run_until(self, predicate, timeout=None, poll_interval=0.05):
+        """Runs the main thread event loop until predicate() is True or timeout seconds pass."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            self.process_events()
+            if predicate():
+                return True
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return False
+            wait = poll_interval
+            with self._timer_lock:
+                if self._timers:
+                    wait = min(wait, max(self._timers[0][0] - now, 0.0))
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            try:
+                event_id, additional_info = self._posted.get(timeout=max(wait, 0.0))
+            except queue.Empty:
+                continue
+            self._dispatch(event_id, additional_info)
+
+    def has_pending_events(self) -> bool:
+        """True while custom events or timers (like a pending dataFileComplete) are waiting."""
+        with self._timer_lock:
+            return bool(self._timers) or not self._posted.empty()
+
+    def reset(self):
+        """Drops all documents, data and pending events, keeps registered handlers."""
+        self.stats = SimulationStats()
+        self.documents = Documents()
+        self.data = Data(self)
+        self.userInterface.messages = []
+        self.log_records = []
+        self._posted = queue.Queue()
+        with self._timer_lock:
+            self._timers = []
+
+    def _next_due_timer(self):
+        with self._timer_lock:
+            if self._timers and self._timers[0][0] <= time.monotonic():
+                return heapq.heappop(self._timers)[2]
+        return None
+
+    def _dispatch(self, event_id, additional_info):
+        event = self._custom_events.get(event_id)
+        self.stats.custom_events += 1
+        if event is not None:
+            event._fire(CustomEventArgs(event, additional_info))
+
+    def _latency(self, base):
+        if base <= 0:
+            return 0.0
+        jitter = self.settings.jitter
+        return max(0.0, base * (1 + self._random.uniform(-jitter, jitter)))
+
+    def _pause(self, base):
+        delay = self._latency(base)
+        if delay > 0:
+            time.sleep(delay)
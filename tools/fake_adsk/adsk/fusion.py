@@ -0,0 +1 @@
+# Headless stand-in for adsk.fusion. Nothing in the add-in needs more than the module to exist.
@@ -0,0 +1,53 @@
+# Merges the results of several runs of the Import And Share add-in into one compact file.
+#
+# Used to combine the outputs of the shards of a folder that was split between several Fusion 360
+# sessions (SHARD_INDEX and SHARD_COUNT in config.py), or to compact the outputs and journals that
+# piled up over many runs. Only the newest row of every source file is kept, see
+# importutils.compact_results. Memory use is bounded by --max-rows however many rows are merged.
+# The type of the merged file is chosen from its extension.
+#
+# Usage:
+#   python tools/merge_results.py shard0/output.csv shard1/output.csv shard2/output.csv -o output.csv
+#   python tools/merge_results.py --by-mtime runs/*.csv runs/*.jsonl -o results.db
+import argparse
+import importlib
+import os
+import sys
+
+TOOLS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+ADDIN_FOLDER = os.path.dirname(TOOLS_FOLDER)
+
+sys.path.insert(0, os.path.dirname(ADDIN_FOLDER))
+
+importutils = importlib.import_module(f'{os.path.basename(ADDIN_FOLDER)}.lib.importutils')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge result files of several runs or shards into one file.')
+    parser.add_argument('inputs', nargs='+', help='csv, jsonl or SQLite result files, later files are newer')
+    parser.add_argument('-o', '--output', required=True, help='merged file, .csv, .jsonl or .db')
+    parser.add_argument('--by-mtime', action='store_true',
+                        help='order the inputs by modification time instead of as given')
+    parser.add_argument('--max-rows', type=int, default=100000, help='rows sorted in memory at a time')
+    parser.add_argument('--temp-folder', help='folder for temporary sort files')
+    args = parser.parse_args()
+
+    for path in args.inputs:
+        if not os.path.isfile(path):
+            parser.error(f'{path} does not exist')
+    try:
+        importutils.sink_kind(args.output)
+        for path in args.inputs:
+            importutils.sink_kind(path)
+    except ValueError as error:
+        parser.error(str(error))
+
+    inputs = sorted(args.inputs, key=os.path.getmtime) if args.by_mtime else args.inputs
+    stats = importutils.compact_results(inputs, args.output, args.max_rows, temp_folder=args.temp_folder)
+    rate = stats['rows_read'] / stats['seconds'] if stats['seconds'] else 0
+    print(f"{len(inputs)} files, {stats['rows_read']} rows read, {stats['rows_written']} rows written to "
+          f"{args.output} in {stats['seconds']:.2f} s ({rate:.0f} rows/s, {stats['runs']} sort runs)")
+
+
+if __name__ == '__main__':
+    main()